@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+"""
+Streaming ingestion of request bodies.
+Bodies are consumed in chunks and never held in full: attack patterns are
+scanned incrementally with a small overlap window so matches spanning a
+chunk boundary are still found, and username/password fields are pulled
+out of form and JSON bodies as they stream past. Memory per request is
+bounded by the chunk size plus a few small windows.
+"""
+
+import codecs
+import re
+from typing import Dict, List, Optional
+from urllib.parse import unquote_plus
+
+
+USERNAME_FIELDS = {'username', 'user', 'login', 'email', 'log', 'user_login', 'uname', 'userid', 'account'}
+PASSWORD_FIELDS = {'password', 'pass', 'passwd', 'pwd', 'pw', 'user_pass', 'secret'}
+
+# Longest text kept from a previous chunk so patterns can match across the boundary
+SCAN_OVERLAP = 64
+# Longest captured credential value, and longest form field buffered while incomplete
+MAX_FIELD = 256
+MAX_PENDING = 2048
+PREVIEW_CHARS = 200
+
+_JSON_FIELD = re.compile(
+    r'"(' + '|'.join(sorted(USERNAME_FIELDS | PASSWORD_FIELDS)) + r')"\s*:\s*"((?:[^"\\]|\\.){0,%d})"' % MAX_FIELD,
+    re.IGNORECASE,
+)
+_JSON_WINDOW = MAX_FIELD * 2 + 64
+
+
+class BodyIngestor:
+    """Incrementally scans a request body for attacks and credentials"""
+
+    def __init__(self, attack_types: Dict[str, str], content_type: str = ''):
+        self._patterns = {name: re.compile(pattern, re.IGNORECASE) for name, pattern in attack_types.items()}
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._tail = ''
+        self._found = set()
+        content_type = content_type.split(';', 1)[0].strip().lower()
+        self._form = content_type in ('', 'application/x-www-form-urlencoded')
+        self._json = content_type == 'application/json' or content_type.endswith('+json')
+        self._pending = ''
+        self.bytes_read = 0
+        self.preview = ''
+        self.credentials: Dict[str, str] = {}
+
+    @property
+    def attack_types(self) -> List[str]:
+        """Attack types seen so far, in pattern order"""
+        return [name for name in self._patterns if name in self._found]
+
+    def feed(self, chunk: bytes) -> None:
+        self.bytes_read += len(chunk)
+        self._consume(self._decoder.decode(chunk))
+
+    def close(self) -> None:
+        """Flush the decoder and any trailing form field"""
+        self._consume(self._decoder.decode(b'', final=True))
+        if self._form and self._pending:
+            self._form_field(self._pending)
+            self._pending = ''
+
+    def _consume(self, text: str) -> None:
+        if not text:
+            return
+        if len(self.preview) < PREVIEW_CHARS:
+            self.preview += text[:PREVIEW_CHARS - len(self.preview)]
+
+        window = self._tail + text
+        for name, pattern in self._patterns.items():
+            if name not in self._found and pattern.search(window):
+                self._found.add(name)
+
+        if self._json:
+            for match in _JSON_FIELD.finditer(window):
+                self._capture(match.group(1), match.group(2).replace('\\"', '"'))
+            self._tail = window[-_JSON_WINDOW:]
+        else:
+            self._tail = window[-SCAN_OVERLAP:]
+
+        if self._form:
+            self._pending += text
+            *fields, self._pending = self._pending.split('&')
+            for field in fields:
+                self._form_field(field)
+            if len(self._pending) > MAX_PENDING:
+                # An oversized field can't be a credential worth keeping
+                self._pending = self._pending[:MAX_PENDING]
+
+    def _form_field(self, field: str) -> None:
+        name, sep, value = field.partition('=')
+        if sep:
+            self._capture(unquote_plus(name), unquote_plus(value))
+
+    def _capture(self, name: str, value: str) -> None:
+        name = name.lower()
+        if name in USERNAME_FIELDS:
+            self.credentials.setdefault('username', value[:MAX_FIELD])
+        elif name in PASSWORD_FIELDS:
+            self.credentials.setdefault('password', value[:MAX_FIELD])
+
+    def summary(self) -> Optional[Dict[str, str]]:
+        """Captured credentials, or None if the body had none"""
+        return dict(self.credentials) if self.credentials else None
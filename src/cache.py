@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""
+Bounded LRU cache for rendered response bodies.
+Entries are evicted least-recently-used first once the total size of the
+cached bytes exceeds the budget, and expire after a TTL. Values are usually
+bytes; other values can be cached by passing their size explicitly.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class ByteLRUCache:
+    """Thread-safe LRU cache of bytes values with a size budget and TTL"""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, value, size = item
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.size -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None) -> None:
+        """Cache a value, evicting the least recently used entries over budget"""
+        size = len(value) if size is None else size
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether key is cached, without touching recency or hit counts"""
+        return key in self._entries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+"""
+Per-client canary token countdown.
+Each client IP counts down its own crawl depth from CANARY_TOKEN_TRIES, so
+the canary goes to the crawler that actually followed that many trap pages
+rather than to whoever happens to request the Nth page overall. Counters
+live in an LRU-bounded table; the clients that got the canary are kept for
+the dashboard.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Tuple
+
+
+# Canary recipients listed on the dashboard, most recent first
+MAX_CANARY_RECIPIENTS = 100
+
+
+class CanaryCounters:
+    """Crawl-depth countdown per IP, with the least recently seen IPs evicted past max_entries"""
+
+    def __init__(self, tries: int, max_entries: int = 65536):
+        self.tries = tries
+        self.max_entries = max_entries
+        self.evictions = 0
+        self.served = 0
+        # ip -> pages left before the canary
+        self._counters: 'OrderedDict[str, int]' = OrderedDict()
+        # ip -> [canaries served, last served timestamp]
+        self._recipients: 'OrderedDict[str, List]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def next_page(self, ip: str) -> Tuple[int, bool]:
+        """Count a trap page for ip; returns (counter shown on the page, whether the canary is due)"""
+        with self._lock:
+            remaining = self._counters.get(ip)
+            if remaining is None:
+                remaining = self.tries
+                if len(self._counters) >= self.max_entries:
+                    self._counters.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._counters.move_to_end(ip)
+            # The countdown restarts after the page carrying the canary
+            self._counters[ip] = remaining - 1 if remaining > 0 else self.tries
+        return remaining, remaining <= 0
+
+    def record_recipient(self, ip: str) -> None:
+        """Remember that ip was served the canary token"""
+        with self._lock:
+            self.served += 1
+            entry = self._recipients.pop(ip, None) or [0, None]
+            entry[0] += 1
+            entry[1] = datetime.now().isoformat()
+            self._recipients[ip] = entry
+            if len(self._recipients) > MAX_CANARY_RECIPIENTS:
+                self._recipients.popitem(last=False)
+
+    def recipients(self) -> List[Tuple[str, int, str]]:
+        """(ip, canaries served, last served) for recent recipients, most recent first"""
+        with self._lock:
+            return [(ip, count, last) for ip, (count, last) in reversed(self._recipients.items())]
@@ -16,12 +16,61 @@ class Config:
     max_counter: int = 10
     canary_token_url: Optional[str] = None
     canary_token_tries: int = 10
+    canary_max_ips: int = 65536
     dashboard_secret_path: str = None
     api_server_url: Optional[str] = None
     api_server_port: int = 8080
     api_server_path: str = "/api/v2/users"
     probability_error_codes: int = 0  # Percentage (0-100)
     server_header: str = "Apache/2.2.22 (Ubuntu)"
+    live_feed_buffer: int = 256
+    live_feed_max_subscribers: int = 32
+    metrics_port: Optional[int] = None
+    metrics_secret_path: Optional[str] = None
+    debug_secret_path: Optional[str] = None
+    log_queue_size: int = 10000
+    log_overflow_policy: str = 'drop_newest'
+    log_shape_rate: float = 2.0
+    log_shape_burst: float = 50.0
+    log_shape_type_rate: float = 100.0
+    log_sample_every: int = 100
+    log_summary_seconds: int = 60
+    log_shape_max_ips: int = 65536
+    event_log_dir: Optional[str] = 'logs/events'
+    event_log_max_bytes: int = 16 * 1024 * 1024
+    event_log_rotate_seconds: int = 3600
+    event_log_max_segments: int = 168
+    secret_pool_size: int = 1024
+    consistent_secrets: bool = True
+    consistent_secrets_key: Optional[str] = None
+    secret_cache_max_bytes: int = 8 * 1024 * 1024
+    secret_cache_ttl: int = 86400
+    decoy_dir: Optional[str] = None
+    decoy_file_size: int = 32 * 1024 * 1024
+    decoy_throttle_bytes: int = 0
+    reload_interval: float = 5.0
+    prerender: bool = False
+    prerender_cache_max_bytes: int = 16 * 1024 * 1024
+    max_post_body: int = 1024 * 1024
+    post_body_timeout: float = 10.0
+    header_timeout: float = 10.0
+    idle_timeout: float = 30.0
+    max_header_count: int = 100
+    max_header_bytes: int = 32 * 1024
+    rate_limit_rps: float = 5.0
+    rate_limit_burst: float = 20.0
+    rate_limit_max_ips: int = 65536
+    tarpit_delay: int = 2000
+    tarpit_slow_after: int = 20
+    tarpit_error_after: int = 100
+    tarpit_slow_bps: int = 1024
+    tarpit_max_concurrent: int = 64
+    ip_lists_file: Optional[str] = None
+    trusted_proxies: str = ''
+    asn_db_file: Optional[str] = None
+    asn_cache_size: int = 65536
+    health_port: Optional[int] = None
+    health_secret_path: Optional[str] = None
 
     @classmethod
     def from_env(cls) -> 'Config':
@@ -41,10 +90,59 @@ class Config:
             max_counter=int(os.getenv('MAX_COUNTER', 10)),
             canary_token_url=os.getenv('CANARY_TOKEN_URL'),
             canary_token_tries=int(os.getenv('CANARY_TOKEN_TRIES', 10)),
+            canary_max_ips=int(os.getenv('CANARY_MAX_IPS', 65536)),
             dashboard_secret_path=os.getenv('DASHBOARD_SECRET_PATH', f'/{os.urandom(16).hex()}'),
             api_server_url=os.getenv('API_SERVER_URL'),
             api_server_port=int(os.getenv('API_SERVER_PORT', 8080)),
             api_server_path=os.getenv('API_SERVER_PATH', '/api/v2/users'),
             probability_error_codes=int(os.getenv('PROBABILITY_ERROR_CODES', 5)),
-            server_header=os.getenv('SERVER_HEADER', 'Apache/2.2.22 (Ubuntu)')
+            server_header=os.getenv('SERVER_HEADER', 'Apache/2.2.22 (Ubuntu)'),
+            live_feed_buffer=int(os.getenv('LIVE_FEED_BUFFER', 256)),
+            live_feed_max_subscribers=int(os.getenv('LIVE_FEED_MAX_SUBSCRIBERS', 32)),
+            metrics_port=int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None,
+            metrics_secret_path=os.getenv('METRICS_SECRET_PATH'),
+            debug_secret_path=os.getenv('DEBUG_SECRET_PATH'),
+            log_queue_size=int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+            log_overflow_policy=os.getenv('LOG_OVERFLOW_POLICY', 'drop_newest'),
+            log_shape_rate=float(os.getenv('LOG_SHAPE_RATE', 2)),
+            log_shape_burst=float(os.getenv('LOG_SHAPE_BURST', 50)),
+            log_shape_type_rate=float(os.getenv('LOG_SHAPE_TYPE_RATE', 100)),
+            log_sample_every=int(os.getenv('LOG_SAMPLE_EVERY', 100)),
+            log_summary_seconds=int(os.getenv('LOG_SUMMARY_SECONDS', 60)),
+            log_shape_max_ips=int(os.getenv('LOG_SHAPE_MAX_IPS', 65536)),
+            event_log_dir=os.getenv('EVENT_LOG_DIR', 'logs/events') or None,
+            event_log_max_bytes=int(os.getenv('EVENT_LOG_MAX_BYTES', 16 * 1024 * 1024)),
+            event_log_rotate_seconds=int(os.getenv('EVENT_LOG_ROTATE_SECONDS', 3600)),
+            event_log_max_segments=int(os.getenv('EVENT_LOG_MAX_SEGMENTS', 168)),
+            secret_pool_size=int(os.getenv('SECRET_POOL_SIZE', 1024)),
+            consistent_secrets=os.getenv('CONSISTENT_SECRETS', 'true').lower() == 'true',
+            consistent_secrets_key=os.getenv('CONSISTENT_SECRETS_KEY'),
+            secret_cache_max_bytes=int(os.getenv('SECRET_CACHE_MAX_BYTES', 8 * 1024 * 1024)),
+            secret_cache_ttl=int(os.getenv('SECRET_CACHE_TTL', 86400)),
+            decoy_dir=os.getenv('DECOY_DIR') or None,
+            decoy_file_size=int(os.getenv('DECOY_FILE_SIZE', 32 * 1024 * 1024)),
+            decoy_throttle_bytes=int(os.getenv('DECOY_THROTTLE_BYTES', 0)),
+            reload_interval=float(os.getenv('RELOAD_INTERVAL', 5)),
+            prerender=os.getenv('PRERENDER', 'false').lower() == 'true',
+            prerender_cache_max_bytes=int(os.getenv('PRERENDER_CACHE_MAX_BYTES', 16 * 1024 * 1024)),
+            max_post_body=int(os.getenv('MAX_POST_BODY', 1024 * 1024)),
+            post_body_timeout=float(os.getenv('POST_BODY_TIMEOUT', 10)),
+            header_timeout=float(os.getenv('HEADER_TIMEOUT', 10)),
+            idle_timeout=float(os.getenv('IDLE_TIMEOUT', 30)),
+            max_header_count=int(os.getenv('MAX_HEADER_COUNT', 100)),
+            max_header_bytes=int(os.getenv('MAX_HEADER_BYTES', 32 * 1024)),
+            rate_limit_rps=float(os.getenv('RATE_LIMIT_RPS', 5)),
+            rate_limit_burst=float(os.getenv('RATE_LIMIT_BURST', 20)),
+            rate_limit_max_ips=int(os.getenv('RATE_LIMIT_MAX_IPS', 65536)),
+            tarpit_delay=int(os.getenv('TARPIT_DELAY', 2000)),
+            tarpit_slow_after=int(os.getenv('TARPIT_SLOW_AFTER', 20)),
+            tarpit_error_after=int(os.getenv('TARPIT_ERROR_AFTER', 100)),
+            tarpit_slow_bps=int(os.getenv('TARPIT_SLOW_BPS', 1024)),
+            tarpit_max_concurrent=int(os.getenv('TARPIT_MAX_CONCURRENT', 64)),
+            ip_lists_file=os.getenv('IP_LISTS_FILE') or None,
+            trusted_proxies=os.getenv('TRUSTED_PROXIES', ''),
+            asn_db_file=os.getenv('ASN_DB_FILE') or None,
+            asn_cache_size=int(os.getenv('ASN_CACHE_SIZE', 65536)),
+            health_port=int(os.getenv('HEALTH_PORT')) if os.getenv('HEALTH_PORT') else None,
+            health_secret_path=os.getenv('HEALTH_SECRET_PATH')
         )
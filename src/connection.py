@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+"""
+Connection-layer input handling with deadlines and header limits.
+ConnectionReader replaces the handler's buffered rfile. Every recv gets
+only the time left until the current phase's deadline, so a slowloris
+client trickling one byte at a time can't stretch a request line, the
+headers or a body past its timeout. Header count and size are capped.
+"""
+
+import http.client
+import socket
+import time
+from typing import Callable, Optional
+
+
+class HeaderLimitError(http.client.HTTPException):
+    """Too many header lines or header bytes; answered with 431 by the handler"""
+
+
+class ConnectionReader:
+    """File-like reader over a socket that enforces per-phase deadlines.
+
+    Phases: 'idle' (waiting for a request line), 'headers', 'body' and
+    None (between phases, where each recv gets the idle timeout).
+    on_timeout(phase) and on_limit(reason) are called before raising.
+    """
+
+    def __init__(self, sock: socket.socket, idle_timeout: float, header_timeout: float,
+                 max_header_count: int, max_header_bytes: int,
+                 on_timeout: Optional[Callable[[str], None]] = None,
+                 on_limit: Optional[Callable[[str], None]] = None):
+        self._sock = sock
+        self._buffer = bytearray()
+        self.idle_timeout = idle_timeout
+        self.header_timeout = header_timeout
+        self.max_header_count = max_header_count
+        self.max_header_bytes = max_header_bytes
+        self.on_timeout = on_timeout
+        self.on_limit = on_limit
+        self.phase: Optional[str] = None
+        self.deadline: Optional[float] = None
+        self._header_count = 0
+        self._header_bytes = 0
+
+    def expect(self, phase: Optional[str], timeout: Optional[float] = None) -> None:
+        """Enter a phase that must complete within timeout seconds"""
+        self.phase = phase
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self._header_count = 0
+        self._header_bytes = 0
+        if self.deadline is None:
+            # Also bounds how long a write to a client that stopped reading may block
+            self._sock.settimeout(self.idle_timeout or None)
+
+    @property
+    def buffered(self) -> int:
+        """Bytes received but not yet consumed, e.g. an unfinished request line"""
+        return len(self._buffer)
+
+    def _recv(self, size: int) -> bytes:
+        if self.deadline is None:
+            # An idle timeout of 0 disables it
+            timeout = self.idle_timeout or None
+        else:
+            timeout = self.deadline - time.monotonic()
+        try:
+            if timeout is not None and timeout <= 0:
+                raise socket.timeout(f'{self.phase} deadline exceeded')
+            self._sock.settimeout(timeout)
+            return self._sock.recv(size)
+        except socket.timeout:
+            if self.on_timeout:
+                self.on_timeout(self.phase or 'idle')
+            raise
+
+    def _take(self, size: int) -> bytes:
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def readline(self, limit: int = -1) -> bytes:
+        while True:
+            end = self._buffer.find(b'\n') + 1
+            if end == 0 and 0 <= limit <= len(self._buffer):
+                end = limit
+            if end:
+                break
+            data = self._recv(65536)
+            if not data:
+                end = len(self._buffer)
+                break
+            self._buffer += data
+        if 0 <= limit < end:
+            end = limit
+        line = self._take(end)
+        self._track_line(line)
+        return line
+
+    def _track_line(self, line: bytes) -> None:
+        if self.phase == 'idle' and line:
+            # Request line received; the headers get their own deadline
+            self.expect('headers', self.header_timeout)
+        elif self.phase == 'headers':
+            if line in (b'\r\n', b'\n', b''):
+                self.expect(None)
+                return
+            self._header_count += 1
+            self._header_bytes += len(line)
+            if self._header_count > self.max_header_count:
+                self._limit_exceeded('count', f'got more than {self.max_header_count} headers')
+            if self._header_bytes > self.max_header_bytes:
+                self._limit_exceeded('size', f'headers larger than {self.max_header_bytes} bytes')
+
+    def _limit_exceeded(self, reason: str, message: str) -> None:
+        self.expect(None)
+        if self.on_limit:
+            self.on_limit(reason)
+        raise HeaderLimitError(message)
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            data = self._recv(65536 if size < 0 else max(size - len(self._buffer), 4096))
+            if not data:
+                break
+            self._buffer += data
+        return self._take(len(self._buffer) if size < 0 else size)
+
+    def read1(self, size: int = -1) -> bytes:
+        """Return buffered bytes, or the result of a single recv"""
+        if not self._buffer:
+            return self._recv(65536 if size < 0 else size)
+        return self._take(len(self._buffer) if size < 0 else size)
+
+    def close(self) -> None:
+        self._buffer.clear()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""
+Per-client consistent fake secrets.
+Secret-bearing pages are generated from a random.Random seeded by a keyed
+hash of (client IP, route), so a returning scanner sees the same
+believable credentials, and any leaked value can be traced back to the IP
+it was served to. Rendered bodies are memoised in a bounded LRU cache.
+
+Run this file to find which IPs were served a leaked value:
+    CONSISTENT_SECRETS_KEY=... python3 consistent_secrets.py VALUE [EVENT_LOG_DIR]
+"""
+
+import hashlib
+import os
+import random
+import sys
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from cache import ByteLRUCache
+
+
+class ConsistentSecrets:
+    """Renders secret pages deterministically per (client IP, route), with caching"""
+
+    def __init__(self, key: bytes, cache: ByteLRUCache):
+        self.key = key[:64]
+        self.cache = cache
+
+    def rng_for(self, client_ip: str, route: str) -> random.Random:
+        """A private generator seeded from the keyed hash of (client IP, route)"""
+        digest = hashlib.blake2b(f'{client_ip}\x00{route}'.encode(), key=self.key, digest_size=16).digest()
+        return random.Random(int.from_bytes(digest, 'big'))
+
+    def render(self, client_ip: str, route: str, build: Callable[[random.Random], str]) -> bytes:
+        """Return the cached body for this client and route, generating it on a miss"""
+        cache_key = (client_ip, route)
+        body = self.cache.get(cache_key)
+        if body is None:
+            body = build(self.rng_for(client_ip, route)).encode()
+            self.cache.put(cache_key, body)
+        return body
+
+
+def secret_builders() -> dict:
+    """Route -> builder(rng) for every page that serves per-client secrets"""
+    from generators import credentials_txt, passwords_txt, users_json, api_keys_json, api_response
+    builders = {
+        '/credentials.txt': credentials_txt,
+        '/passwords.txt': passwords_txt,
+        '/admin_notes.txt': passwords_txt,
+        '/users.json': users_json,
+        '/api_keys.json': api_keys_json,
+        '/config.json': lambda rng: api_response('/api/config', rng),
+    }
+    for path in ('/api/users', '/api/v1/users', '/api/v2/secrets', '/api/config', '/.env'):
+        builders[path] = lambda rng, path=path: api_response(path, rng)
+    return builders
+
+
+def find_leak(secrets: ConsistentSecrets, value: str, clients: List[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+    """Yield the (client IP, route) pairs whose generated pages contain value"""
+    builders = secret_builders()
+    for client_ip, route in clients:
+        build = builders.get(route)
+        if build and value in build(secrets.rng_for(client_ip, route)):
+            yield client_ip, route
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Search the event log for clients that were served a leaked value"""
+    from event_log import read_events
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or not os.getenv('CONSISTENT_SECRETS_KEY'):
+        print(f'Usage: CONSISTENT_SECRETS_KEY=... {sys.argv[0]} VALUE [EVENT_LOG_DIR]')
+        sys.exit(1)
+
+    value = argv[0]
+    directory = argv[1] if len(argv) > 1 else os.path.join('logs', 'events')
+    secrets = ConsistentSecrets(os.environ['CONSISTENT_SECRETS_KEY'].encode(), ByteLRUCache(0, 0))
+    clients = sorted({(event['ip'], event['path']) for event in read_events(directory)})
+    for client_ip, route in find_leak(secrets, value, clients):
+        print(f'{client_ip}\t{route}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+"""
+Structured JSONL event log for the Krawl honeypot.
+Access events from the tracker are queued and written by a background
+thread in batches. Segments rotate by size and age and are gzipped in the
+background, so days of history fit on a small volume.
+
+Run this file to stream stored events back as JSONL:
+    python3 event_log.py [DIR] | jq .
+"""
+
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from logger import get_app_logger
+
+
+ACTIVE_NAME = 'events.jsonl'
+SEGMENT_PREFIX = 'events-'
+
+
+class EventLogWriter:
+    """Tracker listener that persists access events as rotated, compressed JSONL"""
+
+    def __init__(self, directory: str, max_bytes: int = 16 * 1024 * 1024,
+                 rotate_seconds: int = 3600, max_segments: int = 168,
+                 queue_size: int = 10000, flush_interval: float = 1.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        self.dropped = 0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._compress_queue: queue.Queue = queue.Queue()
+        self._sentinel = object()
+        self._sequence = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._active_path = os.path.join(directory, ACTIVE_NAME)
+        # A segment left over from a previous run is rotated out untouched
+        if os.path.exists(self._active_path) and os.path.getsize(self._active_path) > 0:
+            self._rotate_file()
+        for leftover in sorted(glob.glob(os.path.join(directory, SEGMENT_PREFIX + '*.jsonl'))):
+            self._compress_queue.put(leftover)
+        self._open()
+
+        self._writer = threading.Thread(target=self._write_loop, name='event-log-writer', daemon=True)
+        self._compressor = threading.Thread(target=self._compress_loop, name='event-log-compressor', daemon=True)
+        self._writer.start()
+        self._compressor.start()
+
+    def write(self, entry: Dict) -> None:
+        """Tracker listener: queue an event without blocking the request"""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """Write out queued events, close the active segment and finish compression"""
+        self._queue.put(self._sentinel)
+        self._writer.join()
+        self._compress_queue.put(self._sentinel)
+        self._compressor.join()
+
+    def _open(self) -> None:
+        self._file = open(self._active_path, 'ab', buffering=64 * 1024)
+        self._size = self._file.tell()
+        self._opened_at = time.monotonic()
+
+    def _rotate_file(self) -> str:
+        """Move the active segment aside under a sortable timestamped name"""
+        self._sequence += 1
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        rotated = os.path.join(self.directory, f'{SEGMENT_PREFIX}{stamp}-{self._sequence:06d}.jsonl')
+        os.replace(self._active_path, rotated)
+        return rotated
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._compress_queue.put(self._rotate_file())
+        self._open()
+
+    def _write_loop(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._file.flush()
+                if self._size and time.monotonic() - self._opened_at >= self.rotate_seconds:
+                    self._rotate()
+                continue
+
+            batch = [first]
+            while len(batch) < 1024:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(entry is self._sentinel for entry in batch)
+            data = ''.join(
+                json.dumps(entry, separators=(',', ':')) + '\n'
+                for entry in batch if entry is not self._sentinel
+            ).encode()
+            try:
+                self._file.write(data)
+                self._size += len(data)
+                if self._size >= self.max_bytes or time.monotonic() - self._opened_at >= self.rotate_seconds:
+                    self._rotate()
+            except OSError as e:
+                get_app_logger().error(f"Failed to write event log: {e}")
+
+            if stop:
+                self._file.close()
+                return
+
+    def _compress_loop(self) -> None:
+        while True:
+            path = self._compress_queue.get()
+            if path is self._sentinel:
+                return
+            try:
+                with open(path, 'rb') as src, gzip.open(path + '.gz.tmp', 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(path + '.gz.tmp', path + '.gz')
+                os.remove(path)
+                self._prune()
+            except OSError as e:
+                get_app_logger().error(f"Failed to compress event log segment {path}: {e}")
+
+    def _prune(self) -> None:
+        """Delete the oldest compressed segments beyond the retention limit"""
+        segments = list_segments(self.directory, include_active=False)
+        for path in segments[:max(0, len(segments) - self.max_segments)]:
+            os.remove(path)
+
+
+def list_segments(directory: str, include_active: bool = True) -> List[str]:
+    """Event log segments in chronological order, oldest first"""
+    segments = sorted(
+        glob.glob(os.path.join(directory, SEGMENT_PREFIX + '*.jsonl.gz')) +
+        glob.glob(os.path.join(directory, SEGMENT_PREFIX + '*.jsonl'))
+    )
+    active = os.path.join(directory, ACTIVE_NAME)
+    if include_active and os.path.exists(active):
+        segments.append(active)
+    return segments
+
+
+def iter_events(paths: Iterable[str]) -> Iterator[Dict]:
+    """Stream events from plain or gzipped JSONL files, skipping corrupt lines"""
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Truncated tail of a segment that was being written
+                        continue
+        except (OSError, EOFError) as e:
+            get_app_logger().warning(f"Skipping unreadable event log segment {path}: {e}")
+
+
+def read_events(directory: str) -> Iterator[Dict]:
+    """Stream every stored event from an event log directory, oldest first"""
+    return iter_events(list_segments(directory))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Write all events under DIR (default logs/events) to stdout as JSONL"""
+    argv = sys.argv[1:] if argv is None else argv
+    directory = argv[0] if argv else os.path.join('logs', 'events')
+    try:
+        for event in read_events(directory):
+            sys.stdout.write(json.dumps(event, separators=(',', ':')) + '\n')
+    except BrokenPipeError:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,28 @@
 
 import logging
 import random
+import socket
 import time
+import tracemalloc
 from http.server import BaseHTTPRequestHandler
-from typing import Optional, List
+from typing import Optional, Sequence, Tuple
 
 from config import Config
 from tracker import AccessTracker
+from live_feed import LiveFeed, format_sse, KEEPALIVE_SECONDS
+from metrics import KrawlMetrics, CountingWriter, get_metrics, method_label, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiling import Instrumentation, RequestProfile, memory_report, stop_memory_tracing
+from consistent_secrets import ConsistentSecrets
+from decoys import DecoyStore, decoy_kind, parse_range
+from ip_lists import IpLists
+from canary import CanaryCounters
+from log_shaping import shape_tags
+from health import get_health
+from prerender import Prerenderer, RenderedLinks
+from body_ingest import BodyIngestor
+from connection import ConnectionReader
+from rate_limit import RateLimiter, ALLOW, SLOW, ERROR
+from trap_links import child_paths, trap_addresses
 from templates import html_templates
 from templates.dashboard_template import generate_dashboard
 from generators import (
@@ -17,14 +33,89 @@ from generators import (
 from wordlists import get_wordlists
 
 
+# Bytes read from the socket per step while streaming a request body
+BODY_CHUNK_SIZE = 16 * 1024
+
+
 class Handler(BaseHTTPRequestHandler):
     """HTTP request handler for the deception server"""
-    webpages: Optional[List[str]] = None
+    webpages: Optional[Sequence[str]] = None
     config: Config = None
     tracker: AccessTracker = None
-    counter: int = 0
+    canary_counters: Optional[CanaryCounters] = None
     app_logger: logging.Logger = None
     access_logger: logging.Logger = None
+    live_feed: LiveFeed = None
+    metrics: KrawlMetrics = get_metrics()
+    route: str = 'unknown'
+    instrumentation: Optional[Instrumentation] = None
+    consistent_secrets: Optional[ConsistentSecrets] = None
+    decoys: Optional[DecoyStore] = None
+    prerenderer: Optional[Prerenderer] = None
+    rate_limiter: Optional[RateLimiter] = None
+    tarpit: str = ALLOW
+    tarpit_slot: bool = False
+    ip_lists: Optional[IpLists] = None
+    ip_label: Optional[str] = None
+    request_profile: Optional[RequestProfile] = None
+
+    def setup(self):
+        """Read through a deadline-enforcing reader and count bytes sent for metrics"""
+        super().setup()
+        self.rfile = ConnectionReader(
+            self.connection,
+            idle_timeout=self.config.idle_timeout,
+            header_timeout=self.config.header_timeout,
+            max_header_count=self.config.max_header_count,
+            max_header_bytes=self.config.max_header_bytes,
+            on_timeout=self._on_connection_timeout,
+            on_limit=self._on_header_limit,
+        )
+        self.wfile = CountingWriter(self.wfile)
+        self.requests_served = 0
+
+    def _on_connection_timeout(self, phase: str) -> None:
+        self.metrics.connection_timeouts.inc((phase,))
+        # Connections opened ahead of time or kept alive between requests go quiet
+        # normally; only one stalled partway through a request line is suspect
+        if phase == 'idle' and not self.rfile.buffered:
+            return
+        # A body timeout comes after the headers, so it is charged to the client behind
+        # any proxy; earlier phases only know the peer address
+        client_ip = self._get_client_ip() if phase == 'body' else self.client_address[0]
+        self.tracker.record_timeout(client_ip, phase)
+
+    def _on_header_limit(self, reason: str) -> None:
+        self.metrics.header_limit_rejections.inc((reason,))
+
+    def finish(self):
+        """Account for the bytes written over this connection"""
+        try:
+            super().finish()
+        finally:
+            self.metrics.bytes_sent.inc(amount=self.wfile.bytes_written)
+
+    def handle_one_request(self):
+        """Handle a single request and count it by route in the metrics"""
+        self.route = 'unknown'
+        self.tarpit = ALLOW
+        self.tarpit_slot = False
+        self.ip_label = None
+        # A fresh connection must send its request promptly; keep-alive ones may idle
+        self.rfile.expect('idle', self.config.idle_timeout if self.requests_served else self.config.header_timeout)
+        self.requests_served += 1
+        if self.instrumentation:
+            self.request_profile = self.instrumentation.begin()
+        try:
+            super().handle_one_request()
+        finally:
+            if self.tarpit_slot:
+                self.rate_limiter.release_tarpit_slot()
+                self.tarpit_slot = False
+        if getattr(self, 'command', None):
+            self.metrics.requests.inc((self.route, method_label(self.command)))
+            if self.request_profile is not None:
+                self.instrumentation.end(self.request_profile, self.command, self.path, self.route)
 
     def _get_client_ip(self) -> str:
         """Extract client IP address from request, checking proxy headers first"""
@@ -66,163 +157,91 @@ class Handler(BaseHTTPRequestHandler):
             error_codes = [400, 401, 403, 404, 500, 502, 503]
         return random.choice(error_codes)
 
-    def generate_page(self, seed: str) -> str:
-        """Generate a webpage containing random links or canary token"""
-        random.seed(seed)
-        num_pages = random.randint(*self.config.links_per_page_range)
-
-        html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>Krawl</title>
-    <style>
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background-color: #0d1117;
-            color: #c9d1d9;
-            margin: 0;
-            padding: 40px 20px;
-            min-height: 100vh;
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-        }}
-        .container {{
-            max-width: 1200px;
-            width: 100%;
-        }}
-        h1 {{
-            color: #f85149;
-            text-align: center;
-            font-size: 48px;
-            margin: 60px 0 30px;
-        }}
-        .counter {{
-            color: #f85149;
-            text-align: center;
-            font-size: 56px;
-            font-weight: bold;
-            margin-bottom: 60px;
-        }}
-        .links-container {{
-            display: flex;
-            flex-direction: column;
-            gap: 20px;
-            align-items: center;
-        }}
-        .link-box {{
-            background: #161b22;
-            border: 1px solid #30363d;
-            border-radius: 6px;
-            padding: 15px 30px;
-            min-width: 300px;
-            text-align: center;
-            transition: all 0.3s ease;
-        }}
-        .link-box:hover {{
-            background: #1c2128;
-            border-color: #58a6ff;
-            transform: translateY(-2px);
-            box-shadow: 0 4px 12px rgba(88, 166, 255, 0.2);
-        }}
-        a {{
-            color: #58a6ff;
-            text-decoration: none;
-            font-size: 20px;
-            font-weight: 700;
-        }}
-        a:hover {{
-            color: #79c0ff;
-        }}
-        .canary-token {{
-            background: #1c1917;
-            border: 2px solid #f85149;
-            border-radius: 8px;
-            padding: 30px 50px;
-            margin: 40px auto;
-            max-width: 800px;
-            overflow-x: auto;
-        }}
-        .canary-token a {{
-            color: #f85149;
-            font-size: 18px;
-            white-space: nowrap;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Krawl me! &#128376;</h1>
-        <div class="counter">{Handler.counter}</div>
-        
-        <div class="links-container">
-"""
+    @classmethod
+    def render_links(cls, seed: str) -> RenderedLinks:
+        """Links section of the crawler-trap page for seed, and the paths it links to"""
+        addresses = trap_addresses(
+            seed, cls.config.char_space, cls.config.links_length_range,
+            cls.config.links_per_page_range, cls.webpages
+        )
 
-        if Handler.counter <= 0 and self.config.canary_token_url:
-            html += f"""
-            <div class="link-box canary-token">
-                <a href="{self.config.canary_token_url}">{self.config.canary_token_url}</a>
-            </div>
-"""
-
-        if self.webpages is None:
-            for _ in range(num_pages):
-                address = ''.join([
-                    random.choice(self.config.char_space)
-                    for _ in range(random.randint(*self.config.links_length_range))
-                ])
-                html += f"""
+        links = ''.join(f"""
             <div class="link-box">
                 <a href="{address}">{address}</a>
             </div>
-"""
+""" for address in addresses)
+
+        return links.encode(), child_paths(seed, addresses)
+
+    def generate_page(self, seed: str, counter: int, show_canary: bool = False) -> bytes:
+        """Generate a webpage containing random links, plus the canary token if it's due"""
+        if self.prerenderer:
+            links, _ = self.prerenderer.links(seed)
         else:
-            for _ in range(num_pages):
-                address = random.choice(self.webpages)
-                html += f"""
-            <div class="link-box">
-                <a href="{address}">{address}</a>
+            links, _ = self.render_links(seed)
+
+        # The canary section depends on the client's counter, so it is never cached
+        canary = b''
+        if show_canary and self.config.canary_token_url:
+            canary = f"""
+            <div class="link-box canary-token">
+                <a href="{self.config.canary_token_url}">{self.config.canary_token_url}</a>
             </div>
-"""
+""".encode()
 
-        html += """
-        </div>
-    </div>
-</body>
-</html>"""
-        return html
+        return html_templates.crawler_page(counter, canary, links)
 
     def do_HEAD(self):
         """Sends header information"""
+        self.route = 'head'
         self.send_response(200)
         self.send_header("Content-type", "text/html")
         self.end_headers()
 
     def do_POST(self):
         """Handle POST requests (mainly login attempts)"""
-        client_ip = self._get_client_ip()
-        user_agent = self._get_user_agent()
-        post_data = ""
+        self.route = 'login_post'
+        with self.metrics.stage('ip_extraction', self.request_profile):
+            client_ip = self._get_client_ip()
+            user_agent = self._get_user_agent()
 
-        self.access_logger.warning(f"[LOGIN ATTEMPT] {client_ip} - {self.path} - {user_agent[:50]}")
+        list_action = self.check_ip_lists()
+        if list_action == 'block':
+            return
 
-        content_length = int(self.headers.get('Content-Length', 0))
-        if content_length > 0:
-            post_data = self.rfile.read(content_length).decode('utf-8', errors="replace")
+        self.access_logger.warning(f"[LOGIN ATTEMPT] {client_ip} - {self.path} - {user_agent[:50]}",
+                                   extra=shape_tags(client_ip, 'login'))
 
-            self.access_logger.warning(f"[POST DATA] {post_data[:200]}")
+        body = self.ingest_body()
+        if body.bytes_read:
+            self.access_logger.warning(f"[POST DATA] {body.preview}", extra=shape_tags(client_ip, 'post_data'))
+        if body.credentials:
+            self.access_logger.warning(
+                f"[CREDENTIALS] {client_ip} - {body.credentials.get('username', '')!r} / "
+                f"{body.credentials.get('password', '')!r}",
+                extra=shape_tags(client_ip, 'credentials')
+            )
+
+        # the body was scanned while streaming, so record_access gets the findings instead of the text
+        if list_action != 'allow':
+            with self.metrics.stage('tracking', self.request_profile):
+                self.tracker.record_access(
+                    client_ip, self.path, user_agent,
+                    body_attacks=body.attack_types, credentials=body.summary(), ip_label=self.ip_label
+                )
+
+            if self.apply_rate_limit(client_ip):
+                return
+
+        with self.metrics.stage('delay', self.request_profile):
+            time.sleep(1)
 
-        # send the post data (body) to the record_access function so the post data can be used to detect suspicious things.
-        self.tracker.record_access(client_ip, self.path, user_agent, post_data)
-        
-        time.sleep(1)
-        
         try:
             self.send_response(200)
             self.send_header('Content-type', 'text/html')
             self.end_headers()
-            self.wfile.write(html_templates.login_error().encode())
+            with self.metrics.stage('write', self.request_profile):
+                self.write_body(html_templates.login_error())
         except BrokenPipeError:
             # Client disconnected before receiving response, ignore silently
             pass
@@ -230,135 +249,402 @@ class Handler(BaseHTTPRequestHandler):
             # Log other exceptions but don't crash
             self.app_logger.error(f"Failed to send response to {client_ip}: {str(e)}")
 
-    def serve_special_path(self, path: str) -> bool:
+    def check_ip_lists(self) -> Optional[str]:
+        """Classify the client against the CIDR lists before any other work.
+
+        Proxy headers only count when the peer is a trusted proxy. Returns the
+        matched action ('allow', 'block' or 'known') or None; blocked clients
+        have already been answered with 403.
+        """
+        if self.ip_lists is None:
+            return None
+        rule = self.ip_lists.match(self.ip_lists.client_ip(
+            self.client_address[0], self.headers.get('X-Forwarded-For'), self.headers.get('X-Real-IP')))
+        if rule is None:
+            return None
+        action, label = rule
+        self.metrics.ip_list_hits.inc((action, label))
+        if action == 'block':
+            self.route = 'blocked'
+            # An unread request body would be parsed as the next request
+            self.close_connection = True
+            self.send_response(403)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif action == 'known':
+            self.ip_label = label
+        return action
+
+    def apply_rate_limit(self, client_ip: str) -> bool:
+        """Tarpit clients over their rate or flagged by the tracker.
+
+        Returns True if the request was already answered with an error code.
+        """
+        if self.rate_limiter is None:
+            return False
+        self.tarpit = self.rate_limiter.check(client_ip)
+        if self.tarpit == ALLOW:
+            return False
+
+        if self.tarpit == ERROR:
+            self.metrics.rate_limited.inc((self.tarpit,))
+            self.route = 'rate_limited'
+            self.send_response(self._get_random_error_code())
+            self.end_headers()
+            return True
+        # Every delayed or slowed request holds a thread; past the cap, answer at once instead
+        if not self.rate_limiter.acquire_tarpit_slot():
+            self.metrics.rate_limited.inc(('overflow',))
+            self.route = 'rate_limited'
+            self.close_connection = True
+            self.send_response(503)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return True
+        self.tarpit_slot = True
+        self.metrics.rate_limited.inc((self.tarpit,))
+        with self.metrics.stage('delay', self.request_profile):
+            time.sleep(self.config.tarpit_delay / 1000.0)
+        return False
+
+    def write_body(self, body: bytes) -> None:
+        """Write a response body, trickling it out if this client is being tarpitted"""
+        if self.tarpit != SLOW or self.config.tarpit_slow_bps <= 0:
+            self.wfile.write(body)
+            return
+        chunk_size = max(1, self.config.tarpit_slow_bps // 4)
+        for start in range(0, len(body), chunk_size):
+            self.wfile.write(body[start:start + chunk_size])
+            time.sleep(chunk_size / self.config.tarpit_slow_bps)
+
+    def ingest_body(self) -> BodyIngestor:
+        """Stream the request body through a BodyIngestor in bounded chunks.
+
+        At most MAX_POST_BODY bytes are read, within POST_BODY_TIMEOUT
+        seconds; if the client sends more, or too slowly, the rest is left
+        unread and the connection is closed after the response.
+        """
+        body = BodyIngestor(self.tracker.attack_types, self.headers.get('Content-Type', ''))
+        try:
+            content_length = max(0, int(self.headers.get('Content-Length', 0)))
+        except ValueError:
+            content_length = 0
+        remaining = min(content_length, self.config.max_post_body)
+        if content_length > remaining:
+            self.close_connection = True
+
+        self.rfile.expect('body', self.config.post_body_timeout)
+        try:
+            while remaining > 0:
+                chunk = self.rfile.read1(min(BODY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                body.feed(chunk)
+        except (socket.timeout, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            self.rfile.expect(None)
+        body.close()
+        return body
+
+    def _secret_body(self, client_ip: str, route: str, build) -> bytes:
+        """Render a secret-bearing page, consistent per client when enabled"""
+        if self.consistent_secrets:
+            return self.consistent_secrets.render(client_ip, route, build)
+        return build(None).encode()
+
+    def special_path_response(self, path: str, client_ip: str) -> Optional[Tuple[str, str, bytes]]:
+        """Build the (route, content type, body) for special paths like robots.txt, API endpoints, etc."""
+        if path == '/robots.txt':
+            return 'robots', 'text/plain', html_templates.robots_txt()
+
+        if path in ['/credentials.txt', '/passwords.txt', '/admin_notes.txt']:
+            if 'credentials' in path:
+                return 'credentials', 'text/plain', self._secret_body(client_ip, path, credentials_txt)
+            return 'credentials', 'text/plain', self._secret_body(client_ip, path, passwords_txt)
+
+        if path in ['/users.json', '/api_keys.json', '/config.json']:
+            if 'users' in path:
+                return 'json_files', 'application/json', self._secret_body(client_ip, path, users_json)
+            elif 'api_keys' in path:
+                return 'json_files', 'application/json', self._secret_body(client_ip, path, api_keys_json)
+            return 'json_files', 'application/json', self._secret_body(
+                client_ip, path, lambda rng: api_response('/api/config', rng))
+
+        if path in ['/admin', '/admin/', '/admin/login', '/login']:
+            return 'admin_login', 'text/html', html_templates.login_form()
+
+        # WordPress login page
+        if path in ['/wp-login.php', '/wp-login', '/wp-admin', '/wp-admin/']:
+            return 'wordpress', 'text/html', html_templates.wp_login()
+
+        if path in ['/wp-content/', '/wp-includes/'] or 'wordpress' in path.lower():
+            return 'wordpress', 'text/html', html_templates.wordpress()
+
+        if 'phpmyadmin' in path.lower() or path in ['/pma/', '/phpMyAdmin/']:
+            return 'phpmyadmin', 'text/html', html_templates.phpmyadmin()
+
+        if path in ['/api/users', '/api/v1/users', '/api/v2/secrets', '/api/config', '/.env']:
+            return 'api', 'application/json', self._secret_body(client_ip, path, lambda rng: api_response(path, rng))
+
+        if path.startswith('/api/') or path.startswith('/api'):
+            return 'api', 'application/json', api_response(path).encode()
+
+        if path in ['/backup/', '/uploads/', '/private/', '/admin/', '/config/', '/database/']:
+            return 'directory_listing', 'text/html', directory_listing(path)
+
+        return None
+
+    def serve_special_path(self, path: str, client_ip: str) -> bool:
         """Serve special paths like robots.txt, API endpoints, etc."""
-        
+
         try:
-            if path == '/robots.txt':
-                self.send_response(200)
-                self.send_header('Content-type', 'text/plain')
-                self.end_headers()
-                self.wfile.write(html_templates.robots_txt().encode())
-                return True
-            
-            if path in ['/credentials.txt', '/passwords.txt', '/admin_notes.txt']:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/plain')
-                self.end_headers()
-                if 'credentials' in path:
-                    self.wfile.write(credentials_txt().encode())
-                else:
-                    self.wfile.write(passwords_txt().encode())
-                return True
-            
-            if path in ['/users.json', '/api_keys.json', '/config.json']:
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                if 'users' in path:
-                    self.wfile.write(users_json().encode())
-                elif 'api_keys' in path:
-                    self.wfile.write(api_keys_json().encode())
-                else:
-                    self.wfile.write(api_response('/api/config').encode())
-                return True
-            
-            if path in ['/admin', '/admin/', '/admin/login', '/login']:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(html_templates.login_form().encode())
-                return True
-            
-            # WordPress login page
-            if path in ['/wp-login.php', '/wp-login', '/wp-admin', '/wp-admin/']:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(html_templates.wp_login().encode())
-                return True
-            
-            if path in ['/wp-content/', '/wp-includes/'] or 'wordpress' in path.lower():
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(html_templates.wordpress().encode())
-                return True
-            
-            if 'phpmyadmin' in path.lower() or path in ['/pma/', '/phpMyAdmin/']:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(html_templates.phpmyadmin().encode())
-                return True
-            
-            if path.startswith('/api/') or path.startswith('/api') or path in ['/.env']:
-                self.send_response(200)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                self.wfile.write(api_response(path).encode())
-                return True
-            
-            if path in ['/backup/', '/uploads/', '/private/', '/admin/', '/config/', '/database/']:
-                self.send_response(200)
-                self.send_header('Content-type', 'text/html')
-                self.end_headers()
-                self.wfile.write(directory_listing(path).encode())
-                return True
+            with self.metrics.stage('generation', self.request_profile):
+                response = self.special_path_response(path, client_ip)
+            if response is None:
+                return False
+
+            self.route, content_type, body = response
+            self.send_response(200)
+            self.send_header('Content-type', content_type)
+            self.end_headers()
+            with self.metrics.stage('write', self.request_profile):
+                self.write_body(body)
+            return True
         except BrokenPipeError:
             # Client disconnected, ignore silently
-            pass
+            return True
         except Exception as e:
             self.app_logger.error(f"Failed to serve special path {path}: {str(e)}")
             pass
 
         return False
 
+    def serve_decoy(self, path: str) -> bool:
+        """Stream a large decoy file (dump, archive, .git file) straight from disk"""
+        kind = decoy_kind(path) if self.decoys else None
+        size = self.decoys.size(kind) if kind else None
+        if size is None:
+            return False
+
+        self.route = 'decoy'
+        try:
+            byte_range = parse_range(self.headers.get('Range'), size)
+        except ValueError:
+            self.send_response(416)
+            self.send_header('Content-Range', f'bytes */{size}')
+            self.end_headers()
+            return True
+
+        start, end = byte_range or (0, size - 1)
+        try:
+            self.send_response(206 if byte_range else 200)
+            self.send_header('Content-type', self.decoys.content_type(kind))
+            self.send_header('Content-Length', str(end - start + 1))
+            self.send_header('Accept-Ranges', 'bytes')
+            if byte_range:
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.end_headers()
+            with self.metrics.stage('write', self.request_profile):
+                self.wfile.bytes_written += self.decoys.send(self.connection, kind, start, end - start + 1)
+        except (BrokenPipeError, ConnectionResetError):
+            # Scanner gave up on the download
+            pass
+        return True
+
+    def serve_live_feed(self):
+        """Stream access events to the dashboard as Server-Sent Events"""
+        subscriber = self.live_feed.subscribe() if self.live_feed else None
+        if subscriber is None:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            # Sync counters first so the page is correct even if events were missed
+            self.wfile.write(format_sse('counters', self.tracker.get_counters()).encode())
+            self.wfile.flush()
+
+            while not subscriber.evicted:
+                message = subscriber.get(timeout=KEEPALIVE_SECONDS)
+                if message is None:
+                    message = ': keepalive\n\n'
+                self.wfile.write(message.encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Dashboard closed the stream
+            pass
+        except Exception as e:
+            self.app_logger.error(f"Error streaming live feed: {e}")
+        finally:
+            self.live_feed.unsubscribe(subscriber)
+
+    def serve_metrics(self):
+        """Serve Prometheus metrics in the text exposition format"""
+        body = self.metrics.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-type', METRICS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except BrokenPipeError:
+            pass
+
+    def serve_probe(self, probe_path: str) -> bool:
+        """Answer a liveness/readiness probe, untracked and unlogged; False if it isn't one"""
+        result = get_health().probe(probe_path)
+        if result is None:
+            return False
+        self.route = 'health'
+        status, body = result
+        self.send_response(status)
+        self.send_header('Content-type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except BrokenPipeError:
+            pass
+        return True
+
+    def serve_debug(self, action: str):
+        """Serve instrumentation endpoints under the secret debug path"""
+        profiler = self.instrumentation.profiler
+        if action == '/profile/start':
+            profiler.start()
+            body = 'Sampling profiler started\n'
+        elif action == '/profile/stop':
+            profiler.stop()
+            body = profiler.collapsed()
+        elif action == '/profile':
+            body = profiler.collapsed()
+        elif action == '/memory':
+            body = memory_report(self.tracker)
+        elif action == '/memory/stop':
+            body = stop_memory_tracing()
+        elif action == '/timings':
+            body = self.instrumentation.timings_report()
+        else:
+            state = 'running' if profiler.running else 'stopped'
+            tracing = 'running' if tracemalloc.is_tracing() else 'stopped'
+            body = (
+                f'Sampling profiler: {state} ({profiler.sample_count} samples)\n'
+                f'tracemalloc: {tracing}\n'
+                'Endpoints: /profile/start /profile/stop /profile /memory /memory/stop /timings\n'
+            )
+
+        self.send_response(200)
+        self.send_header('Content-type', 'text/plain; charset=utf-8')
+        self.end_headers()
+        try:
+            self.wfile.write(body.encode())
+        except BrokenPipeError:
+            pass
+
     def do_GET(self):
         """Responds to webpage requests"""
-        client_ip = self._get_client_ip()
-        user_agent = self._get_user_agent()
-        
+        health_path = self.config.health_secret_path
+        if health_path and self.path.startswith(health_path + '/') and self.serve_probe(self.path[len(health_path):]):
+            return
+
+        with self.metrics.stage('ip_extraction', self.request_profile):
+            client_ip = self._get_client_ip()
+            user_agent = self._get_user_agent()
+
+        list_action = self.check_ip_lists()
+        if list_action == 'block':
+            return
+
+        debug_path = self.config.debug_secret_path
+        if debug_path and (self.path == debug_path or self.path.startswith(debug_path + '/')):
+            self.route = 'debug'
+            self.serve_debug(self.path[len(debug_path):])
+            return
+
+        if self.config.metrics_secret_path and self.path == self.config.metrics_secret_path:
+            self.route = 'metrics'
+            self.serve_metrics()
+            return
+
+        if self.config.dashboard_secret_path and self.path == self.config.dashboard_secret_path + '/events':
+            self.route = 'live_feed'
+            self.serve_live_feed()
+            return
+
         if self.config.dashboard_secret_path and self.path == self.config.dashboard_secret_path:
+            self.route = 'dashboard'
             self.send_response(200)
             self.send_header('Content-type', 'text/html')
             self.end_headers()
             try:
                 stats = self.tracker.get_stats()
-                self.wfile.write(generate_dashboard(stats).encode())
+                if self.ip_lists:
+                    stats['ip_list_hits'] = self.ip_lists.hits()
+                stats['canary_recipients'] = self.canary_counters.recipients()
+                events_path = self.path + '/events' if self.live_feed else None
+                self.wfile.write(generate_dashboard(stats, events_path))
             except BrokenPipeError:
                 pass
             except Exception as e:
                 self.app_logger.error(f"Error generating dashboard: {e}")
             return
 
-        self.tracker.record_access(client_ip, self.path, user_agent)
+        # Allowlisted clients (health checkers, our own tooling) are served without tracking or tarpitting
+        if list_action != 'allow':
+            with self.metrics.stage('tracking', self.request_profile):
+                self.tracker.record_access(client_ip, self.path, user_agent, ip_label=self.ip_label)
 
-        if self.tracker.is_suspicious_user_agent(user_agent):
-            self.access_logger.warning(f"[SUSPICIOUS] {client_ip} - {user_agent[:50]} - {self.path}")
+            if self.tracker.is_suspicious_user_agent(user_agent):
+                self.access_logger.warning(f"[SUSPICIOUS] {client_ip} - {user_agent[:50]} - {self.path}",
+                                           extra=shape_tags(client_ip, 'suspicious'))
 
-        if self._should_return_error():
+            if self.apply_rate_limit(client_ip):
+                return
+
+        with self.metrics.stage('routing', self.request_profile):
+            return_error = self._should_return_error()
+
+        if return_error:
             error_code = self._get_random_error_code()
-            self.access_logger.info(f"Returning error {error_code} to {client_ip} - {self.path}")
+            self.route = 'injected_error'
+            self.metrics.injected_errors.inc((str(error_code),))
+            self.access_logger.info(f"Returning error {error_code} to {client_ip} - {self.path}",
+                                    extra=shape_tags(client_ip, 'injected_error'))
             self.send_response(error_code)
             self.end_headers()
             return
 
-        if self.serve_special_path(self.path):
+        if self.serve_decoy(self.path):
+            return
+
+        if self.serve_special_path(self.path, client_ip):
             return
 
-        time.sleep(self.config.delay / 1000.0)
+        self.route = 'crawler_trap'
+        with self.metrics.stage('delay', self.request_profile):
+            time.sleep(self.config.delay / 1000.0)
         self.send_response(200)
         self.send_header('Content-type', 'text/html')
         self.end_headers()
 
         try:
-            self.wfile.write(self.generate_page(self.path).encode())
-            
-            Handler.counter -= 1
-            
-            if Handler.counter < 0:
-                Handler.counter = self.config.canary_token_tries
+            counter, show_canary = self.canary_counters.next_page(client_ip)
+            with self.metrics.stage('generation', self.request_profile):
+                page = self.generate_page(self.path, counter, show_canary)
+            with self.metrics.stage('write', self.request_profile):
+                self.write_body(page)
+
+            if show_canary and self.config.canary_token_url:
+                self.canary_counters.record_recipient(client_ip)
+                self.metrics.canary_tokens.inc()
+                self.access_logger.info(f"Canary token served to {client_ip} - {self.path}")
         except BrokenPipeError:
             # Client disconnected, ignore silently
             pass
@@ -367,5 +653,7 @@ class Handler(BaseHTTPRequestHandler):
 
     def log_message(self, format, *args):
         """Override to customize logging - uses access logger"""
+        if self.route == 'health':
+            return
         client_ip = self._get_client_ip()
-        self.access_logger.info(f"{client_ip} - {format % args}")
+        self.access_logger.info(f"{client_ip} - {format % args}", extra=shape_tags(client_ip, 'access'))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+"""
+Liveness and readiness probes for the deception server.
+/healthz answers as long as the process serves HTTP; /readyz only once the
+startup warm-up is done (and again not while shutting down), so Kubernetes
+routes no traffic to a cold pod. Probes are never tracked or logged.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+
+LIVENESS_PATHS = ('/healthz', '/livez')
+READINESS_PATH = '/readyz'
+
+
+class Health:
+    """Readiness state shared by the probe endpoints"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.warmup_seconds: Optional[float] = None
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def mark_ready(self, warmup_seconds: float) -> None:
+        self.warmup_seconds = warmup_seconds
+        self._ready.set()
+
+    def mark_not_ready(self) -> None:
+        """Stop taking new traffic, e.g. while draining on shutdown"""
+        self._ready.clear()
+
+    def probe(self, path: str) -> Optional[Tuple[int, bytes]]:
+        """(status, body) for a probe path, or None if path isn't one"""
+        path = path.split('?', 1)[0]
+        if path in LIVENESS_PATHS:
+            return 200, b'ok\n'
+        if path == READINESS_PATH:
+            if self.ready:
+                return 200, f'ready (warm-up took {self.warmup_seconds * 1000:.0f}ms)\n'.encode()
+            return 503, b'warming up\n'
+        return None
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    """Minimal handler serving the probes on the dedicated health port"""
+    health: Health = None
+
+    def do_GET(self):
+        result = self.health.probe(self.path)
+        status, body = result if result else (404, b'not found\n')
+        self.send_response(status)
+        self.send_header('Content-type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Probes are not honeypot traffic; don't log them"""
+        pass
+
+
+def start_health_server(port: int, health: Health) -> ThreadingHTTPServer:
+    """Serve the probes on a separate port from a background thread"""
+    HealthHandler.health = health
+    server = ThreadingHTTPServer(('0.0.0.0', port), HealthHandler)
+    thread = threading.Thread(target=server.serve_forever, name='health-server', daemon=True)
+    thread.start()
+    return server
+
+
+_health_instance: Optional[Health] = None
+
+
+def get_health() -> Health:
+    """Get the singleton Health instance"""
+    global _health_instance
+    if _health_instance is None:
+        _health_instance = Health()
+    return _health_instance
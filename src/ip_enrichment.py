@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+"""
+Offline ASN and country enrichment of client IPs.
+Loads a local range database (one range per line, tab or comma separated,
+in the iptoasn.com column order):
+
+    range_start  range_end  as_number  country_code  as_description
+
+Range bounds may be IP addresses or integers. Ranges are kept per address
+family in sorted arrays and found with bisect; results are cached per IP,
+so a repeat visitor costs one dict lookup.
+"""
+
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from ipkeys import parse_ip, parse_ip_uncached
+
+
+class IpInfo(NamedTuple):
+    asn: str
+    as_name: str
+    country: str
+
+
+def _parse_bound(text: str) -> Tuple[int, int]:
+    """(version, integer) for a range bound written as an address or a number"""
+    text = text.strip().strip('"')
+    if text.isdigit():
+        value = int(text)
+        return (4 if value < 1 << 32 else 6), value
+    # Bypasses the request-path cache, which a whole database would flush
+    parsed = parse_ip_uncached(text)
+    if parsed is None:
+        raise ValueError(f'invalid address {text!r}')
+    return parsed
+
+
+class RangeTable:
+    """Sorted, non-overlapping [start, end] ranges for one address family"""
+
+    def __init__(self, rows: List[Tuple[int, int, int]], typecode: Optional[str]):
+        rows.sort()
+        # IPv4 bounds fit a compact unsigned array; IPv6 bounds stay Python ints
+        make = (lambda values: array(typecode, values)) if typecode else list
+        self.starts = make(row[0] for row in rows)
+        self.ends = make(row[1] for row in rows)
+        self.infos = array('I', (row[2] for row in rows))
+
+    def find(self, value: int) -> Optional[int]:
+        i = bisect_right(self.starts, value) - 1
+        if i >= 0 and value <= self.ends[i]:
+            return self.infos[i]
+        return None
+
+
+class IpEnricher:
+    """Per-IP ASN/country lookups against a local range database"""
+
+    def __init__(self, path: str, cache_size: int = 65536):
+        self.path = path
+        self.cache_size = cache_size
+        self.ranges = 0
+        self.lookup: Callable[[str], Optional[IpInfo]] = lru_cache(maxsize=1)(lambda ip: None)
+
+    def load(self) -> None:
+        """Parse the database and swap it in, with a fresh cache; on error the old one stays"""
+        rows: Dict[int, List[Tuple[int, int, int]]] = {4: [], 6: []}
+        infos: List[IpInfo] = []
+        info_ids: Dict[IpInfo, int] = {}
+        with open(self.path, 'r', encoding='utf-8', errors='replace') as f:
+            for number, line in enumerate(f, 1):
+                line = line.rstrip('\r\n')
+                if not line or line.startswith('#'):
+                    continue
+                fields = line.split('\t') if '\t' in line else line.split(',', 4)
+                if len(fields) < 4:
+                    raise ValueError(f'{self.path}:{number}: expected start, end, ASN and country')
+                try:
+                    version, start = _parse_bound(fields[0])
+                    end_version, end = _parse_bound(fields[1])
+                except ValueError as e:
+                    if number == 1:
+                        continue  # header row
+                    raise ValueError(f'{self.path}:{number}: {e}') from e
+                if end_version != version or end < start:
+                    raise ValueError(f'{self.path}:{number}: invalid range')
+                asn = fields[2].strip().strip('"').upper().removeprefix('AS')
+                if asn in ('', '0'):
+                    continue  # not routed
+                info = IpInfo(
+                    asn=f'AS{asn}',
+                    as_name=fields[4].strip().strip('"') if len(fields) > 4 else '',
+                    country=fields[3].strip().strip('"').upper() or '??',
+                )
+                info_id = info_ids.setdefault(info, len(infos))
+                if info_id == len(infos):
+                    infos.append(info)
+                rows[version].append((start, end, info_id))
+
+        tables = {4: RangeTable(rows[4], 'I'), 6: RangeTable(rows[6], None)}
+
+        @lru_cache(maxsize=self.cache_size)
+        def lookup(ip: str) -> Optional[IpInfo]:
+            parsed = parse_ip(ip)
+            if parsed is None:
+                return None
+            info_id = tables[parsed[0]].find(parsed[1])
+            return infos[info_id] if info_id is not None else None
+
+        self.ranges = len(rows[4]) + len(rows[6])
+        self.lookup = lookup
+
+    def cache_info(self):
+        """Hit/miss statistics of the current per-IP cache"""
+        return self.lookup.cache_info()
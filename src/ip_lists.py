@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+
+"""
+CIDR allow/block/known lists for classifying clients before any other work.
+Rules come from a local file, one per line:
+
+    # cidr            action  label
+    10.0.0.0/8        allow   internal     # not tracked, logged or rate limited
+    198.51.100.0/24   block   scanner      # answered 403 straight away
+    203.0.113.0/24    known   pentest      # served and tracked, tagged with the label
+
+Prefixes are indexed per address family in one hash table per prefix
+length, so a lookup is at most one dict probe per distinct prefix length
+(longest match wins) regardless of how many prefixes are loaded.
+
+Rules are matched against the connecting peer. Proxy headers are only
+believed when that peer is one of the trusted proxies, since any client
+can send an allowlisted address in X-Forwarded-For.
+"""
+
+import socket
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from ipkeys import IPV4_BITS, IPV6_BITS, parse_ip
+
+
+ACTIONS = ('allow', 'block', 'known')
+
+# (action, label)
+Rule = Tuple[str, str]
+# (version, prefix length, network bits shifted down to the prefix)
+Prefix = Tuple[int, int, int]
+
+
+def parse_cidr(text: str) -> Prefix:
+    """Parse 'addr/len' (or a bare address) without the ipaddress module, which
+    is too slow for lists of hundreds of thousands of prefixes"""
+    address, _, length = text.partition('/')
+    family, bits = (socket.AF_INET6, IPV6_BITS) if ':' in address else (socket.AF_INET, IPV4_BITS)
+    try:
+        value = int.from_bytes(socket.inet_pton(family, address), 'big')
+    except OSError:
+        raise ValueError(f'invalid address {address!r}') from None
+    prefixlen = int(length) if length else bits
+    if not 0 <= prefixlen <= bits:
+        raise ValueError(f'invalid prefix length in {text!r}')
+    return (6 if bits == IPV6_BITS else 4), prefixlen, value >> (bits - prefixlen)
+
+
+class CidrIndex:
+    """Longest-prefix-match index over IPv4 and IPv6 CIDR rules"""
+
+    def __init__(self, rules: List[Tuple[Prefix, Rule]]):
+        tables: Dict[int, Dict[int, Dict[int, Rule]]] = {4: defaultdict(dict), 6: defaultdict(dict)}
+        for (version, prefixlen, prefix), rule in rules:
+            tables[version][prefixlen][prefix] = rule
+        # Longest prefixes first: (shift, table)
+        self._tables = {
+            version: [
+                ((IPV4_BITS if version == 4 else IPV6_BITS) - length, by_length[length])
+                for length in sorted(by_length, reverse=True)
+            ]
+            for version, by_length in tables.items()
+        }
+        self.size = len(rules)
+
+    def lookup(self, version: int, value: int) -> Optional[Rule]:
+        for shift, table in self._tables[version]:
+            rule = table.get(value >> shift)
+            if rule is not None:
+                return rule
+        return None
+
+
+def parse_rules(path: str) -> List[Tuple[Prefix, Rule]]:
+    """Read rules from path, raising ValueError naming the first bad line"""
+    rules = []
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split('#', 1)[0].split()
+            if not fields:
+                continue
+            cidr = fields[0]
+            action = fields[1].lower() if len(fields) > 1 else 'block'
+            label = fields[2] if len(fields) > 2 else action
+            if action not in ACTIONS:
+                raise ValueError(f'{path}:{number}: unknown action {action!r}')
+            try:
+                prefix = parse_cidr(cidr)
+            except ValueError as e:
+                raise ValueError(f'{path}:{number}: {e}') from e
+            rules.append((prefix, (action, label)))
+    return rules
+
+
+def parse_trusted_proxies(text: str) -> CidrIndex:
+    """Index of comma-separated CIDRs, raising ValueError on a bad one"""
+    return CidrIndex([(parse_cidr(cidr.strip()), ('trusted', 'proxy'))
+                      for cidr in text.split(',') if cidr.strip()])
+
+
+class IpLists:
+    """The active CIDR index for a rules file, with hit counters that survive reloads"""
+
+    def __init__(self, path: str, trusted_proxies: str = ''):
+        self.path = path
+        self.index = CidrIndex([])
+        self.trusted_proxies = parse_trusted_proxies(trusted_proxies)
+        self._hits: Dict[Rule, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Build an index from the file and swap it in; on error the old one stays"""
+        self.index = CidrIndex(parse_rules(self.path))
+
+    def is_trusted_proxy(self, ip: str) -> bool:
+        parsed = parse_ip(ip)
+        return parsed is not None and self.trusted_proxies.lookup(*parsed) is not None
+
+    def client_ip(self, peer_ip: str, forwarded_for: Optional[str] = None,
+                  real_ip: Optional[str] = None) -> str:
+        """The address rules apply to: the peer, unless it's a trusted proxy.
+
+        X-Forwarded-For is walked from the right, since each proxy appends the
+        address it saw; the first hop that isn't a trusted proxy is the client.
+        Entries left of it were supplied by the client and are ignored.
+        """
+        if not self.is_trusted_proxy(peer_ip):
+            return peer_ip
+        if forwarded_for:
+            hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+            for hop in reversed(hops):
+                if not self.is_trusted_proxy(hop):
+                    return hop
+            return hops[0] if hops else peer_ip
+        if real_ip:
+            return real_ip.strip()
+        return peer_ip
+
+    def match(self, ip: str) -> Optional[Rule]:
+        """The rule for ip, counting the hit, or None"""
+        parsed = parse_ip(ip)
+        if parsed is None:
+            return None
+        rule = self.index.lookup(*parsed)
+        if rule is not None:
+            with self._lock:
+                self._hits[rule] += 1
+        return rule
+
+    def hits(self) -> List[Tuple[str, str, int]]:
+        """(label, action, hits) for every rule that matched, most hits first"""
+        with self._lock:
+            hits = dict(self._hits)
+        return sorted(((label, action, n) for (action, label), n in hits.items()),
+                      key=lambda x: x[2], reverse=True)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+"""
+Fast IP address parsing into integers, and packed integer keys.
+socket.inet_pton is strict (no '1.2.3' shorthands) and much cheaper than
+the ipaddress module, so it is used on the request path. IPv4-mapped IPv6
+addresses (::ffff:a.b.c.d) are treated as the IPv4 address.
+
+A key packs both families into one int: IPv4 addresses are their 32-bit
+value and IPv6 addresses have bit 128 set on top of their 128-bit value.
+Subnet keys are the key of the network address (/24 for IPv4, /48 for IPv6).
+"""
+
+import socket
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+IPV4_BITS = 32
+IPV6_BITS = 128
+_V4_MAPPED = 0xffff << 32
+_V6_FLAG = 1 << IPV6_BITS
+V4_SUBNET_BITS = 24
+V6_SUBNET_BITS = 48
+_V4_SUBNET_MASK = ~((1 << (IPV4_BITS - V4_SUBNET_BITS)) - 1)
+_V6_SUBNET_MASK = ~((1 << (IPV6_BITS - V6_SUBNET_BITS)) - 1)
+
+# Addresses no TCP peer can have, so seeing one means the header was forged
+_IMPOSSIBLE_V4 = ((0, 8), (0xe0000000, 4), (0xf0000000, 4))  # 0/8, multicast, reserved + broadcast
+_IMPOSSIBLE_V6 = ((0, 128), (0xff << 120, 8))                 # ::, multicast
+
+# Longest textual address, e.g. ffff:ffff:ffff:ffff:ffff:ffff:255.255.255.255
+MAX_IP_CHARS = 45
+
+
+def parse_ip_uncached(text: str) -> Optional[Tuple[int, int]]:
+    """(version, integer) for an IP address string, or None if it isn't one"""
+    try:
+        if ':' in text:
+            value = int.from_bytes(socket.inet_pton(socket.AF_INET6, text), 'big')
+            if value >> 32 == 0xffff:
+                return 4, value ^ _V4_MAPPED
+            return 6, value
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, text), 'big')
+    except (OSError, ValueError):
+        return None
+
+
+_parse_ip_cached = lru_cache(maxsize=65536)(parse_ip_uncached)
+
+
+def parse_ip(text: str) -> Optional[Tuple[int, int]]:
+    """parse_ip_uncached behind a per-address cache for the request path.
+
+    The text may be any X-Forwarded-For value, up to the header size limit;
+    anything too long to be an address is rejected before it can be cached.
+    """
+    if len(text) > MAX_IP_CHARS:
+        return None
+    return _parse_ip_cached(text)
+
+
+def pack_ip(text: str) -> Optional[int]:
+    """Packed key for an IP address string, or None if it isn't one"""
+    parsed = parse_ip(text)
+    if parsed is None:
+        return None
+    version, value = parsed
+    return value if version == 4 else value | _V6_FLAG
+
+
+def unpack_ip(key: int) -> str:
+    """The canonical address string for a packed key"""
+    if key & _V6_FLAG:
+        return socket.inet_ntop(socket.AF_INET6, (key ^ _V6_FLAG).to_bytes(16, 'big'))
+    return socket.inet_ntop(socket.AF_INET, key.to_bytes(4, 'big'))
+
+
+def subnet_key(key: int) -> int:
+    """Key of the /24 (IPv4) or /48 (IPv6) containing a packed address"""
+    if key & _V6_FLAG:
+        return key & _V6_SUBNET_MASK
+    return key & _V4_SUBNET_MASK
+
+
+def format_subnet(key: int) -> str:
+    return f'{unpack_ip(key)}/{V6_SUBNET_BITS if key & _V6_FLAG else V4_SUBNET_BITS}'
+
+
+def is_impossible_source(key: int) -> bool:
+    """Whether a packed address is unspecified, multicast, reserved or broadcast"""
+    if key & _V6_FLAG:
+        value, bits, ranges = key ^ _V6_FLAG, IPV6_BITS, _IMPOSSIBLE_V6
+    else:
+        value, bits, ranges = key, IPV4_BITS, _IMPOSSIBLE_V4
+    return any(value >> (bits - length) == prefix >> (bits - length) for prefix, length in ranges)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+"""
+Memory-mapped line store for very large wordlists.
+A text file is mapped read-only and paired with an index of line start
+offsets, persisted beside it as FILE.idx, so a multi-million line corpus
+costs no heap memory and picking a uniformly random line is O(1).
+
+Run this file to prebuild the index for a wordlist (e.g. at image build):
+    python3 line_store.py FILE [FILE ...]
+"""
+
+import mmap
+import os
+import random
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+from typing import List, Optional
+
+from logger import get_app_logger
+
+
+INDEX_SUFFIX = '.idx'
+# Magic, source size, source mtime (ns); followed by native-endian uint64 offsets
+INDEX_HEADER = struct.Struct('<8sQQ')
+INDEX_MAGIC = b'KRAWLIX1'
+
+
+def build_index(path: str) -> array:
+    """Start offset of every line, plus the end of the file"""
+    with open(path, 'rb') as f:
+        return array('Q', accumulate(map(len, f), initial=0))
+
+
+class LineStore(Sequence):
+    """Read-only sequence of the lines of a text file, backed by mmap.
+
+    Lines are returned without their trailing newline. Being a Sequence,
+    a LineStore works with random.choice, choices and sample directly.
+    """
+
+    def __init__(self, path: str, index_path: Optional[str] = None):
+        self.path = path
+        self.index_path = index_path or path + INDEX_SUFFIX
+        self._data = self._map(path)
+        self._offsets = self._load_index()
+
+    @staticmethod
+    def _map(path: str):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _load_index(self):
+        """Map the persisted index if it matches the file, else rebuild and persist it"""
+        st = os.stat(self.path)
+        try:
+            with open(self.index_path, 'rb') as f:
+                header = f.read(INDEX_HEADER.size)
+                if len(header) == INDEX_HEADER.size and \
+                        INDEX_HEADER.unpack(header) == (INDEX_MAGIC, st.st_size, st.st_mtime_ns):
+                    self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    return memoryview(self._index_map)[INDEX_HEADER.size:].cast('Q')
+        except (OSError, ValueError):
+            pass
+
+        offsets = build_index(self.path)
+        try:
+            tmp = self.index_path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, st.st_size, st.st_mtime_ns))
+                offsets.tofile(f)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            # Read-only mounts (e.g. a ConfigMap) keep the index in memory instead
+            get_app_logger().warning(f"Could not persist line index {self.index_path}: {e}")
+        return offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('line index out of range')
+        return self._data[self._offsets[i]:self._offsets[i + 1]].rstrip(b'\r\n').decode('utf-8', 'replace')
+
+    def random_line(self, rng=random) -> str:
+        """A uniformly random line in O(1)"""
+        return self[rng.randrange(len(self))]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Build (or refresh) the persisted index of each FILE"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(f'Usage: {sys.argv[0]} FILE [FILE ...]')
+        sys.exit(1)
+    for path in argv:
+        print(f'{path}: {len(LineStore(path))} lines')
+
+
+if __name__ == '__main__':
+    main()
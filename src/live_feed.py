@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+"""
+Live feed of access events for the dashboard (Server-Sent Events).
+Each recorded access is serialized once and fanned out to every connected
+dashboard through a bounded per-subscriber queue.
+"""
+
+import json
+import queue
+import threading
+from typing import Dict, List, Optional
+
+# Seconds between SSE comments sent to keep idle connections open
+KEEPALIVE_SECONDS = 15
+
+
+class Subscriber:
+    """A single connected dashboard with its own bounded event buffer"""
+
+    def __init__(self, buffer_size: int):
+        self._queue: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self.evicted = False
+
+    def offer(self, message: str) -> bool:
+        """Queue a message without blocking; returns False if the buffer is full"""
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def get(self, timeout: float) -> Optional[str]:
+        """Wait for the next message, returning None on timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LiveFeed:
+    """Broadcasts tracker events to SSE subscribers, evicting slow consumers"""
+
+    def __init__(self, tracker, buffer_size: int = 256, max_subscribers: int = 32):
+        self.tracker = tracker
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.evicted_count = 0
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+        tracker.add_listener(self.publish)
+
+    def subscribe(self) -> Optional[Subscriber]:
+        """Register a new subscriber, or return None if the feed is full"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscriber = Subscriber(self.buffer_size)
+            self._subscribers.append(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Remove a subscriber from the feed"""
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def publish(self, entry: Dict) -> None:
+        """Tracker listener: push an access event and the current counters"""
+        if not self._subscribers:
+            return
+        message = format_sse('access', {
+            'event': entry,
+            'counters': self.tracker.get_counters(),
+        })
+        with self._lock:
+            for subscriber in list(self._subscribers):
+                if not subscriber.offer(message):
+                    # Slow consumer: drop it rather than buffer without bound
+                    subscriber.evicted = True
+                    self._subscribers.remove(subscriber)
+                    self.evicted_count += 1
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """Format a single Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
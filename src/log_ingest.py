@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+"""
+Offline ingestion of historical logs through the live detection logic.
+Streams any mix of Krawl access.log files, event log JSONL segments and
+Apache/nginx combined-format logs (plain or gzipped) in batches to a pool
+of worker processes. Each batch is classified by its own AccessTracker and
+the partial aggregates are merged, producing the same stats as the live
+dashboard's get_stats() plus a static dashboard page.
+
+The access log and the event log record the same requests, so they must
+not both be read for the same period. A directory holding event log
+segments contributes only those; --source picks one format explicitly.
+
+    python3 log_ingest.py [--workers N] [--json stats.json] [--html dashboard.html]
+                          [--asn-db ip2asn.tsv] [--source auto|events|access] FILE_OR_DIR...
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ip_enrichment import IpEnricher
+from templates.dashboard_template import generate_dashboard
+from tracker import AccessTracker
+
+
+# [2026-10-19 10:20:59] INFO - 203.0.113.9 - "GET /admin HTTP/1.1" 200 -
+_KRAWL_ACCESS = re.compile(
+    r'^\[(?P<ts>[\d-]+ [\d:]+)\] \w+ - (?P<ip>\S+) - "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" \d{3}'
+)
+# 203.0.113.9 - - [19/Oct/2026:10:20:59 +0000] "GET /admin HTTP/1.1" 200 512 "-" "curl/8.4.0"
+_COMBINED = re.compile(
+    r'^(?P<ip>\S+) \S+ \S+ \[(?P<ts>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" \d{3} \S+'
+    r'(?: "[^"]*" "(?P<ua>[^"]*)")?'
+)
+
+# Krawl's access.log doesn't record user agents; '-' keeps them from all counting as empty
+UNKNOWN_USER_AGENT = '-'
+
+SOURCES = ('auto', 'events', 'access')
+
+_enricher: Optional[IpEnricher] = None
+
+
+def _init_worker(asn_db: Optional[str]) -> None:
+    global _enricher
+    if asn_db:
+        _enricher = IpEnricher(asn_db)
+        _enricher.load()
+
+
+def parse_line(line: str) -> Optional[Dict]:
+    """record_access arguments for one log line, or None if it isn't an access"""
+    if line.startswith('{'):
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return None
+        if 'ip' not in event or 'path' not in event:
+            return None
+        return {
+            'ip': event['ip'],
+            'path': event['path'],
+            'user_agent': event.get('user_agent', ''),
+            # Body findings aren't recoverable from the path, so the logged ones are kept
+            'body_attacks': event.get('attack_types') or None,
+            'credentials': event.get('credentials'),
+            'timestamp': event.get('timestamp'),
+        }
+
+    match = _KRAWL_ACCESS.match(line)
+    if match:
+        return {
+            'ip': match['ip'],
+            'path': match['path'],
+            'user_agent': UNKNOWN_USER_AGENT,
+            'timestamp': match['ts'].replace(' ', 'T'),
+        }
+
+    match = _COMBINED.match(line)
+    if match:
+        try:
+            timestamp = datetime.strptime(match['ts'], '%d/%b/%Y:%H:%M:%S %z').isoformat()
+        except ValueError:
+            timestamp = None
+        return {
+            'ip': match['ip'],
+            'path': match['path'],
+            'user_agent': match['ua'] if match['ua'] is not None else UNKNOWN_USER_AGENT,
+            'timestamp': timestamp,
+        }
+    return None
+
+
+def process_batch(lines: List[str]) -> Tuple[Dict, int, int]:
+    """Classify a batch of lines; returns (aggregates, accesses, skipped lines)"""
+    tracker = AccessTracker(keep_log=False)
+    tracker.enricher = _enricher
+    skipped = 0
+    for line in lines:
+        access = parse_line(line)
+        if access is None:
+            skipped += 1
+            continue
+        tracker.record_access(**access)
+    return tracker.export_aggregates(), tracker.access_count, skipped
+
+
+def is_event_log(path: str) -> bool:
+    return '.jsonl' in os.path.basename(path)
+
+
+def expand_paths(paths: Iterable[str], source: str = 'auto') -> List[str]:
+    """Files named directly, matched by a glob, or found under a directory, oldest first.
+
+    With source 'auto', a directory holding event log segments contributes
+    only those, since its access logs record the same requests again.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for root, _, names in os.walk(path):
+                found.extend(os.path.join(root, name) for name in names
+                             if name.endswith(('.log', '.jsonl', '.gz')) or '.log.' in name)
+            if source == 'auto' and any(is_event_log(f) for f in found):
+                found = [f for f in found if is_event_log(f)]
+            files.extend(found)
+        else:
+            files.extend(glob.glob(path) or [path])
+    if source != 'auto':
+        files = [f for f in files if is_event_log(f) == (source == 'events')]
+    return sorted(set(files), key=lambda f: (os.path.getmtime(f) if os.path.exists(f) else 0, f))
+
+
+def read_batches(files: List[str], batch_size: int) -> Iterator[List[str]]:
+    batch: List[str] = []
+    for path in files:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                batch.append(line.rstrip('\n'))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def ingest(files: List[str], workers: int, batch_size: int,
+           asn_db: Optional[str] = None) -> Tuple[AccessTracker, int, int]:
+    """Run files through a process pool and merge the results into one tracker"""
+    tracker = AccessTracker(keep_log=False)
+    accesses = skipped = 0
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(asn_db,)) as pool:
+        pending: Deque[Future] = deque()
+
+        def collect_oldest():
+            nonlocal accesses, skipped
+            # Merged in file order, so ties and per-IP path lists come out as a live run would
+            aggregates, batch_accesses, batch_skipped = pending.popleft().result()
+            tracker.merge_aggregates(aggregates)
+            accesses += batch_accesses
+            skipped += batch_skipped
+
+        for batch in read_batches(files, batch_size):
+            # Bounded in flight, so reading never runs far ahead of the workers
+            if len(pending) >= workers * 2:
+                collect_oldest()
+            pending.append(pool.submit(process_batch, batch))
+        while pending:
+            collect_oldest()
+    return tracker, accesses, skipped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Run Krawl detections over historical logs')
+    parser.add_argument('paths', nargs='+', help='log files, globs or directories (.gz is decompressed)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=20000, help='lines per batch sent to a worker')
+    parser.add_argument('--asn-db', help='IP range database for ASN/country stats (see ASN_DB_FILE)')
+    parser.add_argument('--source', choices=SOURCES, default='auto',
+                        help='read only event logs or only access/combined logs (default: event logs '
+                             'where a directory has them)')
+    parser.add_argument('--json', help='write the stats as JSON to this file')
+    parser.add_argument('--html', help='write a static dashboard page to this file')
+    args = parser.parse_args()
+
+    files = expand_paths(args.paths, args.source)
+    missing = [f for f in files if not os.path.isfile(f)]
+    if missing:
+        sys.exit(f'not found: {", ".join(missing)}')
+    if any(is_event_log(f) for f in files) and not all(is_event_log(f) for f in files):
+        print('warning: reading both event logs and access logs; requests in both are counted twice '
+              '(use --source to pick one)', file=sys.stderr)
+
+    start = time.perf_counter()
+    tracker, accesses, skipped = ingest(files, args.workers, args.batch_size, args.asn_db)
+    elapsed = time.perf_counter() - start
+    stats = tracker.get_stats()
+
+    print(f'{len(files)} files, {accesses} accesses ({skipped} other lines skipped) '
+          f'in {elapsed:.1f}s with {args.workers} workers ({accesses / max(elapsed, 1e-9):.0f}/s)',
+          file=sys.stderr)
+    print(f'unique IPs: {stats["unique_ips"]}  suspicious: {stats["suspicious_accesses"]}  '
+          f'honeypot IPs: {stats["honeypot_ips"]}  invalid/forged IPs: {stats["invalid_ips"]}')
+    for title, key in (('Top IPs', 'top_ips'), ('Top subnets', 'top_subnets'), ('Top paths', 'top_paths')):
+        print(f'\n{title}:')
+        for row in stats[key][:5]:
+            print('  ' + '  '.join(str(value) for value in row))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(stats, f, indent=2, default=list)
+    if args.html:
+        with open(args.html, 'wb') as f:
+            f.write(generate_dashboard(stats))
+
+
+if __name__ == '__main__':
+    main()
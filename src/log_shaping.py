@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+"""
+Log shaping for the access log.
+A single scanner can produce tens of thousands of identical access log
+lines a minute, rotating away everything else. LogShaper is a logging
+filter that gives every (client IP, message type) pair a token bucket;
+once a pair overdraws its bucket only every Nth line is written, and a
+bucket per message type caps the total regardless of how many IPs take
+part. What was held back is reported periodically as one
+"suppressed N similar lines from IP X" line per noisy client.
+
+Only records tagged with shape_tags() are shaped. The tracker, event log
+and metrics still see every request.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+# Noisiest clients reported individually per summary; the rest are summed up in one line
+MAX_SUMMARY_LINES = 20
+
+
+def shape_tags(client_ip: str, kind: str) -> Dict[str, str]:
+    """`extra` for a log call that should be shaped as a line of type kind from client_ip"""
+    return {'client_ip': client_ip, 'log_kind': kind}
+
+
+class LogShaper(logging.Filter):
+    """Token buckets per (IP, message type) and per message type, with 1-in-N sampling past them"""
+
+    def __init__(self, logger: logging.Logger, rate: float, burst: float, type_rate: float,
+                 sample_every: int = 100, summary_seconds: float = 60, max_entries: int = 65536):
+        super().__init__()
+        self.logger = logger
+        self.rate = rate
+        self.burst = burst
+        self.type_rate = type_rate
+        # A type may burst for ten seconds' worth of lines
+        self.type_burst = type_rate * 10
+        self.sample_every = max(1, sample_every)
+        self.summary_seconds = summary_seconds
+        self.max_entries = max_entries
+        self.evictions = 0
+        # kind -> lines held back since startup
+        self.suppressed_total: Dict[str, int] = {}
+        # (ip, kind) -> [tokens, last refill time, lines over the limit since the bucket last filled]
+        self._buckets: 'OrderedDict[Tuple[str, str], List[float]]' = OrderedDict()
+        # kind -> [tokens, last refill time]
+        self._type_buckets: Dict[str, List[float]] = {}
+        # (ip, kind) -> lines held back since the last summary
+        self._pending: Dict[Tuple[str, str], int] = {}
+        # Lines held back from pairs that no longer fit in _pending
+        self._pending_overflow = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        kind = getattr(record, 'log_kind', None)
+        if kind is None:
+            return True
+        key = (record.client_ip, kind)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.burst, now, 0]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_entries:
+                    self._buckets.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                if bucket[0] >= self.burst:
+                    bucket[2] = 0
+
+            sampled = False
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                allowed = True
+            else:
+                bucket[2] += 1
+                # Deterministic rather than random, so a steady flood leaves an evenly spaced trace
+                sampled = allowed = bucket[2] % self.sample_every == 0
+
+            if allowed:
+                type_bucket = self._type_buckets.get(kind)
+                if type_bucket is None:
+                    type_bucket = self._type_buckets[kind] = [self.type_burst, now]
+                type_bucket[0] = min(self.type_burst, type_bucket[0] + (now - type_bucket[1]) * self.type_rate)
+                type_bucket[1] = now
+                if type_bucket[0] >= 1:
+                    type_bucket[0] -= 1
+                else:
+                    allowed = False
+
+            if not allowed:
+                self.suppressed_total[kind] = self.suppressed_total.get(kind, 0) + 1
+                if key in self._pending or len(self._pending) < self.max_entries:
+                    self._pending[key] = self._pending.get(key, 0) + 1
+                else:
+                    self._pending_overflow += 1
+                return False
+
+        if sampled:
+            record.msg = f'{record.msg} (sampled 1 in {self.sample_every})'
+        return True
+
+    def suppressed(self) -> Dict[str, int]:
+        """Lines held back since startup, by message type"""
+        with self._lock:
+            return dict(self.suppressed_total)
+
+    def summarize(self) -> List[str]:
+        """Summary lines for what was held back since the last call, noisiest clients first"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            overflow, self._pending_overflow = self._pending_overflow, 0
+        ranked = sorted(pending.items(), key=lambda item: item[1], reverse=True)
+        lines = [
+            f'[SUPPRESSED] {count} similar {kind} lines from {ip}'
+            for (ip, kind), count in ranked[:MAX_SUMMARY_LINES]
+        ]
+        rest = ranked[MAX_SUMMARY_LINES:]
+        if rest or overflow:
+            lines.append(f'[SUPPRESSED] {sum(count for _, count in rest) + overflow} more lines from other IPs')
+        return lines
+
+    def flush(self) -> None:
+        """Write the summary lines; they are untagged, so never shaped themselves"""
+        for line in self.summarize():
+            self.logger.info(line)
+
+    def start(self) -> None:
+        """Attach to the logger and write summaries every summary_seconds from a background thread"""
+        self.logger.addFilter(self)
+        self._thread = threading.Thread(target=self._run, name='log-shaper', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the summary thread, writing out a last summary"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.summary_seconds):
+            self.flush()
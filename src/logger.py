@@ -3,11 +3,110 @@
 """
 Logging singleton module for the Krawl honeypot.
 Provides two loggers: app (application) and access (HTTP access logs).
+
+Loggers only enqueue records into a bounded queue; a background listener
+formats and writes them in batches, so slow disks or stdout never add
+latency to request threads.
 """
 
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List
+
+# Overflow policies for a full log queue
+OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+
+class _DeferredFlushMixin:
+    """Handler mixin that skips per-record flushes while a batch is written"""
+    deferred = False
+
+    def flush(self):
+        if not self.deferred:
+            super().flush()
+
+
+class BatchedRotatingFileHandler(_DeferredFlushMixin, RotatingFileHandler):
+    """RotatingFileHandler that flushes once per batch"""
+    pass
+
+
+class BatchedStreamHandler(_DeferredFlushMixin, logging.StreamHandler):
+    """StreamHandler that flushes once per batch"""
+    pass
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller unless told to, counting dropped lines"""
+
+    def __init__(self, log_queue: queue.Queue, overflow_policy: str = 'drop_newest'):
+        super().__init__(log_queue)
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown log overflow policy '{overflow_policy}', expected one of {OVERFLOW_POLICIES}")
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Leave formatting to the listener thread; records never leave the process"""
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow_policy == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.overflow_policy == 'drop_oldest':
+                try:
+                    self.queue.get_nowait()
+                    self.queue.put_nowait(record)
+                except (queue.Empty, queue.Full):
+                    pass
+
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener that drains records in batches and flushes handlers once per batch"""
+
+    def __init__(self, log_queue: queue.Queue, *handlers, batch_size: int = 256):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def enqueue_sentinel(self) -> None:
+        # The queue is bounded; wait for room instead of failing on shutdown
+        self.queue.put(self._sentinel)
+
+    def _monitor(self) -> None:
+        q = self.queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for handler in self.handlers:
+                handler.deferred = True
+            try:
+                for record in batch:
+                    if record is self._sentinel:
+                        stop = True
+                        continue
+                    self.handle(record)
+            finally:
+                for handler in self.handlers:
+                    handler.deferred = False
+                    handler.flush()
+                for _ in batch:
+                    q.task_done()
+            if stop:
+                break
 
 
 class LoggerManager:
@@ -20,12 +119,15 @@ class LoggerManager:
             cls._instance._initialized = False
         return cls._instance
 
-    def initialize(self, log_dir: str = "logs") -> None:
+    def initialize(self, log_dir: str = "logs", queue_size: int = 10000,
+                   overflow_policy: str = "drop_newest") -> None:
         """
-        Initialize the logging system with rotating file handlers.
+        Initialize the logging system with queued, rotating file handlers.
 
         Args:
             log_dir: Directory for log files (created if not exists)
+            queue_size: Maximum records buffered per logger before the overflow policy applies
+            overflow_policy: 'drop_newest', 'drop_oldest' or 'block' when the queue is full
         """
         if self._initialized:
             return
@@ -43,41 +145,60 @@ class LoggerManager:
         max_bytes = 1048576  # 1MB
         backup_count = 5
 
-        # Setup application logger
-        self._app_logger = logging.getLogger("krawl.app")
-        self._app_logger.setLevel(logging.INFO)
-        self._app_logger.handlers.clear()
-
-        app_file_handler = RotatingFileHandler(
-            os.path.join(log_dir, "krawl.log"),
-            maxBytes=max_bytes,
-            backupCount=backup_count
-        )
-        app_file_handler.setFormatter(log_format)
-        self._app_logger.addHandler(app_file_handler)
+        self._queue_handlers: Dict[str, BoundedQueueHandler] = {}
+        self._listeners: List[BatchingQueueListener] = []
 
-        app_stream_handler = logging.StreamHandler()
-        app_stream_handler.setFormatter(log_format)
-        self._app_logger.addHandler(app_stream_handler)
+        def setup_logger(name: str, filename: str) -> logging.Logger:
+            logger = logging.getLogger(name)
+            logger.setLevel(logging.INFO)
+            logger.handlers.clear()
 
-        # Setup access logger
-        self._access_logger = logging.getLogger("krawl.access")
-        self._access_logger.setLevel(logging.INFO)
-        self._access_logger.handlers.clear()
-
-        access_file_handler = RotatingFileHandler(
-            os.path.join(log_dir, "access.log"),
-            maxBytes=max_bytes,
-            backupCount=backup_count
-        )
-        access_file_handler.setFormatter(log_format)
-        self._access_logger.addHandler(access_file_handler)
+            file_handler = BatchedRotatingFileHandler(
+                os.path.join(log_dir, filename),
+                maxBytes=max_bytes,
+                backupCount=backup_count
+            )
+            file_handler.setFormatter(log_format)
+
+            stream_handler = BatchedStreamHandler()
+            stream_handler.setFormatter(log_format)
+
+            log_queue = queue.Queue(maxsize=queue_size)
+            queue_handler = BoundedQueueHandler(log_queue, overflow_policy)
+            logger.addHandler(queue_handler)
+
+            listener = BatchingQueueListener(log_queue, file_handler, stream_handler)
+            listener.start()
 
-        access_stream_handler = logging.StreamHandler()
-        access_stream_handler.setFormatter(log_format)
-        self._access_logger.addHandler(access_stream_handler)
+            self._queue_handlers[name] = queue_handler
+            self._listeners.append(listener)
+            return logger
+
+        # Setup application logger
+        self._app_logger = setup_logger("krawl.app", "krawl.log")
+
+        # Setup access logger
+        self._access_logger = setup_logger("krawl.access", "access.log")
 
         self._initialized = True
+        atexit.register(self.shutdown)
+
+    def shutdown(self) -> None:
+        """Stop the background listeners, writing out every queued record"""
+        if not self._initialized:
+            return
+        for listener in self._listeners:
+            listener.stop()
+        for listener in self._listeners:
+            for handler in listener.handlers:
+                handler.close()
+        self._listeners = []
+
+    def dropped_counts(self) -> Dict[str, int]:
+        """Number of log lines dropped because a logger's queue was full"""
+        if not self._initialized:
+            return {}
+        return {name: handler.dropped for name, handler in self._queue_handlers.items()}
 
     @property
     def app(self) -> logging.Logger:
@@ -108,6 +229,17 @@ def get_access_logger() -> logging.Logger:
     return _logger_manager.access
 
 
-def initialize_logging(log_dir: str = "logs") -> None:
+def initialize_logging(log_dir: str = "logs", queue_size: int = 10000,
+                       overflow_policy: str = "drop_newest") -> None:
     """Initialize the logging system."""
-    _logger_manager.initialize(log_dir)
+    _logger_manager.initialize(log_dir, queue_size, overflow_policy)
+
+
+def shutdown_logging() -> None:
+    """Flush queued log records and stop the logging threads."""
+    _logger_manager.shutdown()
+
+
+def get_dropped_log_counts() -> Dict[str, int]:
+    """Get the number of dropped log lines per logger."""
+    return _logger_manager.dropped_counts()
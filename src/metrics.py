@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+"""
+Prometheus metrics for the Krawl honeypot.
+Counters and histograms are updated in place on the request path and
+rendered in the text exposition format on scrape, so a scrape costs
+O(series) no matter how many events have been recorded.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Latency buckets in seconds, from sub-millisecond generation up to tarpit delays
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Request methods exported as labels; anything else a client sends is counted as 'other'
+LABELED_METHODS = frozenset(('GET', 'POST', 'HEAD', 'PUT', 'DELETE', 'OPTIONS', 'PATCH'))
+
+
+def _escape(value) -> str:
+    """Escape a label value for the text exposition format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    """Render a label set as {name="value",...}"""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def method_label(method: str) -> str:
+    """Bound the method label: it comes straight from the client's request line"""
+    return method if method in LABELED_METHODS else 'other'
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integers free of a trailing .0"""
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with an optional fixed set of labels.
+
+    Updates take a single uncontended lock; Python int updates on a shared
+    dict are not atomic once requests run on several threads.
+    """
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        """Increment the series identified by labels"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple[str, ...] = ()) -> float:
+        """Current value of a series"""
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        """Exposition lines for every series"""
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+            for labels, value in items
+        ]
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time"""
+    type_name = 'gauge'
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        return [f'{self.name} {_format_value(self.callback())}']
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets and an optional set of labels"""
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()) -> None:
+        """Record one observation"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(s[0]), s[1], s[2]) for labels, s in self._series.items()]
+        lines = []
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        """Add a metric family to the registry and return it"""
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in the text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+class KrawlMetrics:
+    """The set of metrics exported by the honeypot"""
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        r = self.registry
+        self.requests = r.register(Counter(
+            'krawl_requests_total', 'Requests handled, by route and method', ('route', 'method')))
+        self.attacks = r.register(Counter(
+            'krawl_attacks_total', 'Detected attack patterns, by type', ('type',)))
+        self.suspicious_user_agents = r.register(Counter(
+            'krawl_suspicious_user_agents_total', 'Requests with a suspicious or missing User-Agent'))
+        self.honeypot_hits = r.register(Counter(
+            'krawl_honeypot_hits_total', 'Requests to honeypot paths advertised in robots.txt'))
+        self.injected_errors = r.register(Counter(
+            'krawl_injected_errors_total', 'Random error responses injected, by status code', ('code',)))
+        self.bytes_sent = r.register(Counter(
+            'krawl_response_bytes_total', 'Bytes written to clients, including headers'))
+        self.connection_timeouts = r.register(Counter(
+            'krawl_connection_timeouts_total', 'Connections closed for being too slow, by phase', ('phase',)))
+        self.header_limit_rejections = r.register(Counter(
+            'krawl_header_limit_rejections_total', 'Requests rejected for too many or too large headers',
+            ('reason',)))
+        self.rate_limited = r.register(Counter(
+            'krawl_rate_limited_total', 'Requests tarpitted by the per-IP rate limiter, by action', ('action',)))
+        self.ip_list_hits = r.register(Counter(
+            'krawl_ip_list_hits_total', 'Requests matching a CIDR allow/block/known rule', ('action', 'label')))
+        self.canary_tokens = r.register(Counter(
+            'krawl_canary_tokens_served_total', 'Trap pages served with the canary token'))
+        self.stage_seconds = r.register(Histogram(
+            'krawl_handler_stage_seconds', 'Time spent in each request handling stage', ('stage',)))
+
+    def attach_tracker(self, tracker) -> None:
+        """Subscribe to tracker events and export its headline counters"""
+        def on_access(entry: Dict) -> None:
+            for attack_type in entry['attack_types']:
+                self.attacks.inc((attack_type,))
+            if entry['honeypot_triggered']:
+                self.honeypot_hits.inc()
+            if tracker.is_suspicious_user_agent(entry['user_agent']):
+                self.suspicious_user_agents.inc()
+
+        tracker.add_listener(on_access)
+        self.registry.register(Gauge(
+            'krawl_tracked_accesses', 'Accesses held in the tracker', lambda: len(tracker.access_log)))
+        self.registry.register(Gauge(
+            'krawl_tracked_unique_ips', 'Distinct client IPs seen by the tracker', lambda: len(tracker.ip_counts)))
+
+    @contextmanager
+    def stage(self, name: str, profile=None):
+        """Time a block of handler work as the given stage.
+
+        If a per-request profile is given (instrumentation mode), the
+        elapsed time is also added to its stage breakdown.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_seconds.observe(elapsed, (name,))
+            if profile is not None:
+                profile.add(name, elapsed)
+
+
+class CountingWriter:
+    """Wraps a handler's wfile and counts the bytes written through it"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.bytes_written = 0
+
+    def write(self, data) -> int:
+        written = self._raw.write(data)
+        self.bytes_written += len(data)
+        return written
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Minimal handler serving /metrics on the dedicated metrics port"""
+    metrics: KrawlMetrics = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.metrics.registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Scrapes are not honeypot traffic; don't log them"""
+        pass
+
+
+def start_metrics_server(port: int, metrics: KrawlMetrics) -> ThreadingHTTPServer:
+    """Serve /metrics on a separate port from a background thread"""
+    MetricsHandler.metrics = metrics
+    server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    return server
+
+
+_metrics_instance: Optional[KrawlMetrics] = None
+
+
+def get_metrics() -> KrawlMetrics:
+    """Get the singleton KrawlMetrics instance"""
+    global _metrics_instance
+    if _metrics_instance is None:
+        _metrics_instance = KrawlMetrics()
+    return _metrics_instance
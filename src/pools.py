@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+"""
+Pools of pre-generated fake secrets (usernames, passwords, emails, API keys).
+Values are generated in bulk and topped up by a background thread when a
+pool drops below its low-water mark, so request handlers only pop values.
+"""
+
+import random
+import string
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from wordlists import get_wordlists
+
+
+ALNUM = string.ascii_letters + string.digits
+UPPER_ALNUM = string.ascii_uppercase + string.digits
+LOWER_ALNUM = string.ascii_lowercase + string.digits
+BASE64_CHARS = ALNUM + '+/'
+
+
+def random_strings(alphabet: str, length: int, count: int, prefix: str = '', rng=random) -> List[str]:
+    """Generate count random strings with a single bulk choices call"""
+    chars = ''.join(rng.choices(alphabet, k=length * count))
+    return [prefix + chars[i:i + length] for i in range(0, length * count, length)]
+
+
+def bulk_usernames(count: int, rng=random) -> List[str]:
+    wl = get_wordlists()
+    prefixes = rng.choices(wl.username_prefixes, k=count)
+    suffixes = rng.choices(wl.username_suffixes, k=count)
+    return [p + s for p, s in zip(prefixes, suffixes)]
+
+
+def bulk_passwords(count: int, rng=random) -> List[str]:
+    """Passwords: random alphanumeric, prefix + digits + '!', simple word + digits, or lowercase"""
+    wl = get_wordlists()
+    shapes = rng.choices(range(4), k=count)
+    passwords = []
+    for shape in shapes:
+        if shape == 0:
+            passwords.append(''.join(rng.choices(ALNUM, k=12)))
+        elif shape == 1:
+            passwords.append(f"{rng.choice(wl.password_prefixes)}{rng.randint(100, 999)}!")
+        elif shape == 2:
+            passwords.append(f"{rng.choice(wl.simple_passwords)}{rng.randint(1000, 9999)}")
+        else:
+            passwords.append(''.join(rng.choices(string.ascii_lowercase, k=8)))
+    return passwords
+
+
+def bulk_emails(count: int, rng=random) -> List[str]:
+    domains = rng.choices(get_wordlists().email_domains, k=count)
+    return [f"{username}@{domain}" for username, domain in zip(bulk_usernames(count, rng), domains)]
+
+
+def bulk_api_keys(count: int, rng=random) -> List[str]:
+    prefixes = rng.choices(get_wordlists().api_key_prefixes, k=count)
+    return [p + key for p, key in zip(prefixes, random_strings(ALNUM, 32, count, rng=rng))]
+
+
+# Pool name -> bulk factory(count, rng); provider-shaped keys match the formats scanners look for
+POOL_FACTORIES: Dict[str, Callable[..., List[str]]] = {
+    'username': bulk_usernames,
+    'password': bulk_passwords,
+    'email': bulk_emails,
+    'api_key': bulk_api_keys,
+    'stripe_public_key': lambda n, rng=random: random_strings(ALNUM, 24, n, 'pk_live_', rng),
+    'aws_access_key_id': lambda n, rng=random: random_strings(UPPER_ALNUM, 16, n, 'AKIA', rng),
+    'aws_secret_access_key': lambda n, rng=random: random_strings(BASE64_CHARS, 40, n, rng=rng),
+    'sendgrid_api_key': lambda n, rng=random: random_strings(ALNUM, 48, n, 'SG.', rng),
+    'twilio_account_sid': lambda n, rng=random: random_strings(LOWER_ALNUM, 32, n, 'AC', rng),
+    'twilio_auth_token': lambda n, rng=random: random_strings(LOWER_ALNUM, 32, n, rng=rng),
+    'app_key': lambda n, rng=random: random_strings(ALNUM, 32, n, rng=rng),
+}
+
+
+class Pool:
+    """A refillable pool of pre-generated values of one kind"""
+
+    def __init__(self, name: str, factory: Callable[[int], List[str]], size: int, low_water: int,
+                 on_low: Callable[[], None]):
+        self.name = name
+        self.factory = factory
+        self.size = size
+        self.low_water = low_water
+        self._on_low = on_low
+        self._values: deque = deque()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def fill(self) -> None:
+        """Top the pool up to its full size in one bulk generation"""
+        missing = self.size - len(self._values)
+        if missing > 0:
+            self._values.extend(self.factory(missing))
+
+    def clear(self) -> None:
+        self._values.clear()
+
+    def draw(self) -> str:
+        """Take one value, generating inline only if the pool ran dry"""
+        try:
+            value = self._values.popleft()
+        except IndexError:
+            value = self.factory(1)[0]
+        if len(self._values) < self.low_water:
+            self._on_low()
+        return value
+
+
+class PoolManager:
+    """Owns every secret pool and the background thread that refills them"""
+
+    def __init__(self, size: int = 1024, low_water_ratio: float = 0.25):
+        low_water = max(1, int(size * low_water_ratio))
+        self._refill_needed = threading.Event()
+        self.pools: Dict[str, Pool] = {
+            name: Pool(name, factory, size, low_water, self._refill_needed.set)
+            for name, factory in POOL_FACTORIES.items()
+        }
+        self._refiller: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def fill_all(self) -> None:
+        for pool in self.pools.values():
+            pool.fill()
+
+    def reset(self) -> None:
+        """Discard pooled values (e.g. after the wordlists changed) and refill"""
+        for pool in self.pools.values():
+            pool.clear()
+        self.fill_all()
+
+    def start(self) -> None:
+        """Fill every pool and start the background refiller"""
+        with self._lock:
+            if self._refiller is not None:
+                return
+            self.fill_all()
+            self._refiller = threading.Thread(target=self._refill_loop, name='secret-pool-refiller', daemon=True)
+            self._refiller.start()
+
+    def _refill_loop(self) -> None:
+        while True:
+            self._refill_needed.wait()
+            self._refill_needed.clear()
+            for pool in self.pools.values():
+                if len(pool) < pool.low_water:
+                    pool.fill()
+
+    def draw(self, name: str) -> str:
+        return self.pools[name].draw()
+
+
+_pool_manager: Optional[PoolManager] = None
+
+
+def init_pools(size: int = 1024) -> PoolManager:
+    """Create, fill and start the singleton PoolManager"""
+    global _pool_manager
+    if _pool_manager is None:
+        _pool_manager = PoolManager(size)
+    _pool_manager.start()
+    return _pool_manager
+
+
+def get_pools() -> PoolManager:
+    """Get the singleton PoolManager, starting it with defaults on first use"""
+    if _pool_manager is None:
+        return init_pools()
+    return _pool_manager
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+"""
+Speculative pre-rendering of the crawler-trap link graph.
+Trap pages are deterministic per path and crawlers follow the links the
+previous page emitted, so after each trap page is served its child pages
+are rendered in the background into a bounded LRU. The next hop is then
+a cache hit. Only the links section is cached; the canary counter is
+spliced in at serve time.
+"""
+
+import queue
+import threading
+from typing import Callable, Iterable, Tuple
+
+from cache import ByteLRUCache
+from logger import get_app_logger
+
+
+# (encoded links section, child paths it links to)
+RenderedLinks = Tuple[bytes, Tuple[str, ...]]
+
+
+class Prerenderer:
+    """Renders the children of served trap pages ahead of the crawler"""
+
+    def __init__(self, render: Callable[[str], RenderedLinks], cache: ByteLRUCache,
+                 queue_size: int = 1024, workers: int = 1):
+        self.render = render
+        self.cache = cache
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        for i in range(workers):
+            threading.Thread(target=self._work_loop, name=f'prerender-{i}', daemon=True).start()
+
+    def links(self, path: str) -> RenderedLinks:
+        """Links section for path, from cache or rendered now, and queue its children"""
+        rendered = self.cache.get(path)
+        if rendered is None:
+            rendered = self.render(path)
+            self._store(path, rendered)
+        self.schedule(rendered[1])
+        return rendered
+
+    def schedule(self, paths: Iterable[str]) -> None:
+        """Queue paths for background rendering; dropped if the queue is full"""
+        for path in paths:
+            if path in self.cache:
+                continue
+            try:
+                self._queue.put_nowait(path)
+            except queue.Full:
+                self.dropped += 1
+
+    def _store(self, path: str, rendered: RenderedLinks) -> None:
+        links, children = rendered
+        self.cache.put(path, rendered, len(links) + sum(len(c) for c in children))
+
+    def _work_loop(self) -> None:
+        while True:
+            path = self._queue.get()
+            if path in self.cache:
+                continue
+            try:
+                self._store(path, self.render(path))
+            except Exception as e:
+                get_app_logger().error(f"Failed to pre-render {path}: {e}")
+
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+"""
+Opt-in hot-path instrumentation for the Krawl honeypot.
+Provides per-request stage breakdowns, a sampling profiler that dumps
+collapsed stacks (flamegraph.pl / speedscope compatible) and tracemalloc
+snapshots, all served from a secret debug path.
+"""
+
+import heapq
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+
+
+class RequestProfile:
+    """Stage timings collected for a single request"""
+    __slots__ = ('stages', 'start')
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.start = time.perf_counter()
+
+    def add(self, stage: str, elapsed: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+
+    def total(self) -> float:
+        return time.perf_counter() - self.start
+
+
+class SamplingProfiler:
+    """Samples the stacks of all request threads at a fixed interval"""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start sampling in a background thread, discarding previous samples"""
+        if self.running:
+            return
+        self.samples.clear()
+        self.sample_count = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling, keeping the collected samples"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format, one 'frame;frame;... count' per line"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+class Instrumentation:
+    """Collects request breakdowns and owns the profiler for the debug endpoints"""
+
+    def __init__(self, slow_requests: int = 20, recent_requests: int = 1000):
+        self.profiler = SamplingProfiler()
+        self.slow_requests = slow_requests
+        self._slowest: List[Tuple[float, int, Dict]] = []
+        self._recent: deque = deque(maxlen=recent_requests)
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def begin(self) -> RequestProfile:
+        """Start timing a request"""
+        return RequestProfile()
+
+    def end(self, profile: RequestProfile, method: str, path: str, route: str) -> None:
+        """Record the finished request's stage breakdown"""
+        total = profile.total()
+        record = {
+            'method': method,
+            'path': path[:200],
+            'route': route,
+            'total_ms': total * 1000,
+            'stages_ms': {stage: elapsed * 1000 for stage, elapsed in profile.stages.items()},
+        }
+        with self._lock:
+            self._sequence += 1
+            self._recent.append(record)
+            item = (total, self._sequence, record)
+            if len(self._slowest) < self.slow_requests:
+                heapq.heappush(self._slowest, item)
+            elif total > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def timings_report(self) -> str:
+        """Per-stage averages over recent requests plus the slowest requests seen"""
+        with self._lock:
+            recent = list(self._recent)
+            slowest = sorted(self._slowest, reverse=True)
+
+        lines = [f'# Stage breakdown over the last {len(recent)} requests']
+        totals: Dict[str, float] = {}
+        for record in recent:
+            for stage, elapsed in record['stages_ms'].items():
+                totals[stage] = totals.get(stage, 0.0) + elapsed
+        for stage, elapsed in sorted(totals.items(), key=lambda x: x[1], reverse=True):
+            lines.append(f'{stage:<15} total={elapsed:10.2f}ms  avg={elapsed / len(recent):8.3f}ms')
+
+        lines.append('')
+        lines.append(f'# Slowest {len(slowest)} requests')
+        for _, _, record in slowest:
+            stages = ' '.join(f'{s}={ms:.2f}' for s, ms in record['stages_ms'].items())
+            lines.append(f"{record['total_ms']:9.2f}ms {record['method']} {record['route']} {record['path']} [{stages}]")
+        return '\n'.join(lines) + '\n'
+
+
+def container_report(tracker) -> str:
+    """Entry counts and shallow sizes of the tracker's growing containers"""
+    lines = ['# Tracker containers (entries, shallow size of the container itself)']
+    for name, value in sorted(vars(tracker).items()):
+        if isinstance(value, (dict, list, deque)):
+            lines.append(f'{name:<20} entries={len(value):<10} size={sys.getsizeof(value)} bytes')
+    return '\n'.join(lines) + '\n'
+
+
+def memory_report(tracker, limit: int = 25) -> str:
+    """Top allocation sites from tracemalloc, starting tracing on first call.
+
+    Tracing slows every allocation and stays on until stop_memory_tracing().
+    """
+    lines = [container_report(tracker)]
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(10)
+        lines.append('# tracemalloc was not running and has been started.')
+        lines.append('# Only allocations made from now on are traced; request this page again later.')
+        lines.append('# Tracing is now running and slows the server; stop it with /memory/stop.')
+        return '\n'.join(lines) + '\n'
+
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    lines.append('# Tracing is running and slows the server; stop it with /memory/stop.')
+    lines.append(f'# Traced memory: current={current / 1024:.1f} KiB peak={peak / 1024:.1f} KiB')
+    lines.append(f'# Top {limit} allocation sites')
+    for stat in snapshot.statistics('lineno')[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f'{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}')
+    return '\n'.join(lines) + '\n'
+
+
+def stop_memory_tracing() -> str:
+    """Stop tracemalloc, freeing its traces"""
+    if not tracemalloc.is_tracing():
+        return '# tracemalloc was not running.\n'
+    tracemalloc.stop()
+    return '# tracemalloc stopped.\n'
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+"""
+Per-IP adaptive rate limiting and tarpit escalation.
+Each client IP gets a token bucket in an LRU-bounded table. Clients within
+their rate are answered normally; the further a client overdraws its
+bucket (or if the tracker has flagged it), the harder it is tarpitted:
+an extra delay, then a slowly streamed response, then a cheap error code.
+Delayed and slowed requests each hold a request thread, so only
+max_tarpitted of them run at once; past that, clients get an immediate 503.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+
+# Escalation levels, in increasing order of severity
+ALLOW = 'allow'
+DELAY = 'delay'
+SLOW = 'slow'
+ERROR = 'error'
+LEVELS = (ALLOW, DELAY, SLOW, ERROR)
+
+
+class RateLimiter:
+    """Token bucket per IP, with the least recently seen IPs evicted past max_entries"""
+
+    def __init__(self, rate: float, burst: float, max_entries: int = 65536,
+                 slow_after: int = 20, error_after: int = 100,
+                 is_flagged: Optional[Callable[[str], bool]] = None, max_tarpitted: int = 64):
+        self.rate = rate
+        self.burst = burst
+        self.max_entries = max_entries
+        self.slow_after = slow_after
+        self.error_after = error_after
+        self.is_flagged = is_flagged
+        self.max_tarpitted = max_tarpitted
+        self.evictions = 0
+        self.tarpitted = 0
+        self.overflows = 0
+        # ip -> [tokens, last refill time, requests over the limit since the bucket last filled]
+        self._buckets: 'OrderedDict[str, List[float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def check(self, ip: str) -> str:
+        """Take a token for a request from ip and return how to treat it"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(ip)
+            if bucket is None:
+                bucket = [self.burst, now, 0]
+                self._buckets[ip] = bucket
+                if len(self._buckets) > self.max_entries:
+                    self._buckets.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._buckets.move_to_end(ip)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                if bucket[0] >= self.burst:
+                    bucket[2] = 0
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                level = 0
+            else:
+                bucket[2] += 1
+                overdraft = bucket[2]
+                level = 3 if overdraft >= self.error_after else 2 if overdraft >= self.slow_after else 1
+
+        # Clients the tracker already caught probing are tarpitted one level harder
+        if self.is_flagged and self.is_flagged(ip):
+            level = min(level + 1, len(LEVELS) - 1)
+        return LEVELS[level]
+
+    def acquire_tarpit_slot(self) -> bool:
+        """Reserve one of the max_tarpitted slots for a delayed or slowed request"""
+        with self._lock:
+            if self.tarpitted >= self.max_tarpitted:
+                self.overflows += 1
+                return False
+            self.tarpitted += 1
+            return True
+
+    def release_tarpit_slot(self) -> None:
+        with self._lock:
+            self.tarpitted -= 1
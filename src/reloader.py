@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+"""
+Hot reload of bait content (wordlists.json, the line-store files it names,
+and HTML templates) and other watched files without restarting the server.
+A background thread polls file mtime/inode/size and reloads on change, or
+immediately on SIGHUP. New content is built and validated off the request
+path and swapped in atomically; if validation fails the old content stays.
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from logger import get_app_logger
+from templates.template_loader import reload_templates, template_files
+from wordlists import WORDLISTS_PATH, get_wordlists, reload_wordlists
+
+
+def _fingerprint(path: str) -> Optional[Tuple[int, int, int]]:
+    """(mtime, inode, size), following symlinks as ConfigMap mounts use them"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_ino, st.st_size
+
+
+class ContentReloader:
+    """Watches bait content files and swaps in new versions when they change"""
+
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.reloads = 0
+        self.failures = 0
+        self._trigger = threading.Event()
+        self._listeners: List[Callable[[], None]] = []
+        self._wordlist_state = self._snapshot(self._wordlist_files())
+        self._template_state = self._snapshot(self._template_files())
+        # path -> (loader, fingerprint at the last check)
+        self._watched: Dict[str, Tuple[Callable[[], None], Optional[Tuple[int, int, int]]]] = {}
+
+    def watch_file(self, path: str, load: Callable[[], None]) -> None:
+        """Call load whenever path changes; load raises OSError/ValueError to keep the old version"""
+        self._watched[path] = (load, _fingerprint(path))
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """Call callback after new wordlists have been swapped in"""
+        self._listeners.append(callback)
+
+    def start(self) -> None:
+        threading.Thread(target=self._watch_loop, name='content-reloader', daemon=True).start()
+
+    def trigger(self) -> None:
+        """Request a reload check now; safe to call from a signal handler"""
+        self._trigger.set()
+
+    @staticmethod
+    def _wordlist_files() -> List[str]:
+        return [str(WORDLISTS_PATH)] + get_wordlists().files()
+
+    @staticmethod
+    def _template_files() -> List[str]:
+        return [str(p) for p in template_files()]
+
+    @staticmethod
+    def _snapshot(paths: List[str]) -> Dict[str, Optional[Tuple[int, int, int]]]:
+        return {path: _fingerprint(path) for path in paths}
+
+    def _watch_loop(self) -> None:
+        while True:
+            # interval 0 means SIGHUP only
+            self._trigger.wait(self.interval or None)
+            self._trigger.clear()
+            self.check()
+
+    def check(self) -> None:
+        """Reload whatever changed since the last successful load"""
+        app_logger = get_app_logger()
+
+        wordlist_state = self._snapshot(self._wordlist_files())
+        if wordlist_state != self._wordlist_state:
+            try:
+                reload_wordlists()
+            except (OSError, ValueError) as e:
+                self.failures += 1
+                app_logger.error(f"Wordlists reload failed, keeping previous version: {e}")
+            else:
+                self.reloads += 1
+                app_logger.info(f"Reloaded wordlists from {WORDLISTS_PATH}")
+                for listener in self._listeners:
+                    listener()
+            # Files named by the new wordlists are watched from now on
+            self._wordlist_state = self._snapshot(self._wordlist_files())
+
+        template_state = self._snapshot(self._template_files())
+        if template_state != self._template_state:
+            try:
+                reload_templates()
+            except (OSError, ValueError) as e:
+                self.failures += 1
+                app_logger.error(f"Templates reload failed, keeping previous version: {e}")
+            else:
+                self.reloads += 1
+                app_logger.info("Reloaded templates")
+            self._template_state = template_state
+
+        for path, (load, state) in list(self._watched.items()):
+            current = _fingerprint(path)
+            if current == state:
+                continue
+            try:
+                load()
+            except (OSError, ValueError) as e:
+                self.failures += 1
+                app_logger.error(f"Reload of {path} failed, keeping previous version: {e}")
+            else:
+                self.reloads += 1
+                app_logger.info(f"Reloaded {path}")
+            self._watched[path] = (load, current)
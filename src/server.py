@@ -5,13 +5,34 @@ Main server module for the deception honeypot.
 Run this file to start the server.
 """
 
+import os
+import signal
 import sys
-from http.server import HTTPServer
+import threading
+from http.server import ThreadingHTTPServer
 
 from config import Config
 from tracker import AccessTracker
 from handler import Handler
-from logger import initialize_logging, get_app_logger, get_access_logger
+from live_feed import LiveFeed
+from metrics import Gauge, get_metrics, start_metrics_server
+from profiling import Instrumentation
+from event_log import EventLogWriter
+from pools import init_pools, get_pools
+from cache import ByteLRUCache
+from consistent_secrets import ConsistentSecrets
+from decoys import init_decoys
+from ip_lists import IpLists
+from ip_enrichment import IpEnricher
+from line_store import LineStore
+from prerender import Prerenderer
+from rate_limit import RateLimiter
+from canary import CanaryCounters
+from log_shaping import LogShaper
+from reloader import ContentReloader
+from health import get_health, start_health_server
+from warmup import warm_up
+from logger import initialize_logging, shutdown_logging, get_app_logger, get_access_logger, get_dropped_log_counts
 
 
 def print_usage():
@@ -29,10 +50,65 @@ def print_usage():
     print('  MAX_COUNTER           - Max counter value (default: 10)')
     print('  CANARY_TOKEN_URL      - Canary token URL to display')
     print('  CANARY_TOKEN_TRIES    - Number of tries before showing token (default: 10)')
+    print('  CANARY_MAX_IPS        - Per-IP canary counters kept, least recent evicted (default: 65536)')
     print('  DASHBOARD_SECRET_PATH - Secret path for dashboard (auto-generated if not set)')
     print('  PROBABILITY_ERROR_CODES - Probability (0-100) to return HTTP error codes (default: 0)')
     print('  CHAR_SPACE            - Characters for random links')
     print('  SERVER_HEADER         - HTTP Server header for deception (default: Apache/2.2.22 (Ubuntu))')
+    print('  LIVE_FEED_BUFFER      - Events buffered per dashboard live feed (default: 256)')
+    print('  LIVE_FEED_MAX_SUBSCRIBERS - Max concurrent dashboard live feeds (default: 32)')
+    print('  METRICS_PORT          - Serve Prometheus metrics at /metrics on this port (disabled if not set)')
+    print('  METRICS_SECRET_PATH   - Serve Prometheus metrics at this path on the main port (disabled if not set)')
+    print('  LOG_QUEUE_SIZE        - Log records buffered per logger before overflow (default: 10000)')
+    print('  LOG_OVERFLOW_POLICY   - drop_newest, drop_oldest or block when the log queue is full (default: drop_newest)')
+    print('  LOG_SHAPE_RATE        - Access log lines/second per IP and message type before sampling, 0 to disable (default: 2)')
+    print('  LOG_SHAPE_BURST       - Access log lines an IP may burst per message type (default: 50)')
+    print('  LOG_SHAPE_TYPE_RATE   - Access log lines/second per message type across all IPs (default: 100)')
+    print('  LOG_SAMPLE_EVERY      - Past its rate, write 1 in this many of an IP\'s lines (default: 100)')
+    print('  LOG_SUMMARY_SECONDS   - Seconds between summaries of suppressed lines (default: 60)')
+    print('  LOG_SHAPE_MAX_IPS     - IPs tracked by the log shaper, least recent evicted (default: 65536)')
+    print('  EVENT_LOG_DIR         - Directory for the structured JSONL event log, empty to disable (default: logs/events)')
+    print('  EVENT_LOG_MAX_BYTES   - Rotate the event log after this many bytes (default: 16777216)')
+    print('  EVENT_LOG_ROTATE_SECONDS - Rotate the event log after this many seconds (default: 3600)')
+    print('  EVENT_LOG_MAX_SEGMENTS - Compressed event log segments to keep (default: 168)')
+    print('  SECRET_POOL_SIZE      - Pre-generated fake secrets kept per kind when CONSISTENT_SECRETS is off (default: 1024)')
+    print('  CONSISTENT_SECRETS    - Serve the same fake secrets to a client on every visit (default: true)')
+    print('  CONSISTENT_SECRETS_KEY - Key for per-client secrets; set it to keep them stable across restarts')
+    print('  SECRET_CACHE_MAX_BYTES - Memory budget for cached per-client secret pages (default: 8388608)')
+    print('  SECRET_CACHE_TTL      - Seconds a cached per-client secret page is kept (default: 86400)')
+    print('  DECOY_DIR             - Directory for large decoy downloads (.sql, .zip, .git), built at startup (disabled if not set)')
+    print('  DECOY_FILE_SIZE       - Size in bytes of the decoy SQL dump (default: 33554432)')
+    print('  DECOY_THROTTLE_BYTES  - Per-connection decoy download rate in bytes/second, 0 for unlimited (default: 0)')
+    print('  WORDLISTS_FILE        - Path of wordlists.json (default: wordlists.json in the app directory)')
+    print('  RELOAD_INTERVAL       - Seconds between checks for changed wordlists/templates, 0 for SIGHUP only (default: 5)')
+    print('  PRERENDER             - Pre-render the pages linked from each crawler-trap page in the background (default: false)')
+    print('  PRERENDER_CACHE_MAX_BYTES - Memory budget for pre-rendered crawler-trap pages (default: 16777216)')
+    print('  MAX_POST_BODY         - Largest POST body read and scanned, in bytes (default: 1048576)')
+    print('  POST_BODY_TIMEOUT     - Seconds allowed to receive a request body (default: 10)')
+    print('  HEADER_TIMEOUT        - Seconds to receive the request line, and then the headers (default: 10)')
+    print('  IDLE_TIMEOUT          - Seconds a connection may wait for a request or stall a read/write, 0 to disable (default: 30)')
+    print('  MAX_HEADER_COUNT      - Most request header lines accepted (default: 100)')
+    print('  MAX_HEADER_BYTES      - Largest total request header size in bytes (default: 32768)')
+    print('  RATE_LIMIT_RPS        - Sustained requests/second per IP before tarpitting, 0 to disable (default: 5)')
+    print('  RATE_LIMIT_BURST      - Requests an IP may burst above the rate (default: 20)')
+    print('  RATE_LIMIT_MAX_IPS    - IPs tracked by the rate limiter, least recent evicted (default: 65536)')
+    print('  TARPIT_DELAY          - Extra delay in ms for IPs over their rate or flagged (default: 2000)')
+    print('  TARPIT_SLOW_AFTER     - Requests over the limit before responses are streamed slowly (default: 20)')
+    print('  TARPIT_ERROR_AFTER    - Requests over the limit before answering with error codes (default: 100)')
+    print('  TARPIT_SLOW_BPS       - Bytes/second for slowly streamed responses (default: 1024)')
+    print('  TARPIT_MAX_CONCURRENT - Delayed or slowed requests at once; more get an immediate 503 (default: 64)')
+    print('  IP_LISTS_FILE         - File of CIDR allow/block/known rules, reloaded when it changes (disabled if not set)')
+    print('  TRUSTED_PROXIES       - Comma-separated CIDRs of proxies whose X-Forwarded-For the IP lists trust (default: none)')
+    print('  ASN_DB_FILE           - Local IP range database (iptoasn TSV/CSV) for ASN/country stats (disabled if not set)')
+    print('  ASN_CACHE_SIZE        - IPs whose ASN/country lookup is cached (default: 65536)')
+    print('  HEALTH_PORT           - Serve /healthz and /readyz probes on this separate port (disabled if not set)')
+    print('  HEALTH_SECRET_PATH    - Serve <path>/healthz and <path>/readyz probes on the main port (disabled if not set)')
+    print('  DEBUG_SECRET_PATH     - Enable profiling and per-stage timing endpoints at this path (disabled if not set)')
+
+
+def handle_sigterm(signum, frame):
+    """Treat SIGTERM (e.g. a Kubernetes pod shutdown) like Ctrl-C so logs are flushed"""
+    raise KeyboardInterrupt
 
 
 def main():
@@ -41,25 +117,153 @@ def main():
         print_usage()
         exit(0)
 
+    config = Config.from_env()
+    signal.signal(signal.SIGTERM, handle_sigterm)
+
     # Initialize logging
-    initialize_logging()
+    initialize_logging(queue_size=config.log_queue_size, overflow_policy=config.log_overflow_policy)
     app_logger = get_app_logger()
     access_logger = get_access_logger()
 
-    config = Config.from_env()
-
     tracker = AccessTracker()
 
     Handler.config = config
     Handler.tracker = tracker
-    Handler.counter = config.canary_token_tries
+    Handler.canary_counters = CanaryCounters(config.canary_token_tries, config.canary_max_ips)
     Handler.app_logger = app_logger
     Handler.access_logger = access_logger
+    Handler.live_feed = LiveFeed(
+        tracker,
+        buffer_size=config.live_feed_buffer,
+        max_subscribers=config.live_feed_max_subscribers
+    )
+    get_metrics().attach_tracker(tracker)
+    get_metrics().registry.register(Gauge(
+        'krawl_log_lines_dropped', 'Log lines dropped because the log queue was full',
+        lambda: sum(get_dropped_log_counts().values())))
+
+    # Per-IP sampling keeps one scanner from rotating away the whole access log
+    log_shaper = None
+    if config.log_shape_rate > 0:
+        log_shaper = LogShaper(
+            access_logger, config.log_shape_rate, config.log_shape_burst, config.log_shape_type_rate,
+            sample_every=config.log_sample_every, summary_seconds=config.log_summary_seconds,
+            max_entries=config.log_shape_max_ips
+        )
+        log_shaper.start()
+        shaper = log_shaper
+        get_metrics().registry.register(Gauge(
+            'krawl_log_lines_suppressed', 'Access log lines held back by per-IP log shaping',
+            lambda: sum(shaper.suppressed().values())))
+
+    canary_counters = Handler.canary_counters
+    get_metrics().registry.register(Gauge(
+        'krawl_canary_tracked_ips', 'IPs with a canary countdown in progress', lambda: len(canary_counters)))
+    if config.debug_secret_path:
+        Handler.instrumentation = Instrumentation()
+
+    # Probes answer from the start; readiness waits for the warm-up below
+    if config.health_port:
+        start_health_server(config.health_port, get_health())
+        app_logger.info(f'Health probes available on port {config.health_port} at /healthz and /readyz')
+
+    event_log = None
+    if config.event_log_dir:
+        event_log = EventLogWriter(
+            config.event_log_dir,
+            max_bytes=config.event_log_max_bytes,
+            rotate_seconds=config.event_log_rotate_seconds,
+            max_segments=config.event_log_max_segments
+        )
+        tracker.add_listener(event_log.write)
+
+    # Per-client secrets are derived from a keyed hash; pools only serve when that's off
+    if config.consistent_secrets:
+        if config.consistent_secrets_key:
+            key = config.consistent_secrets_key.encode()
+        else:
+            key = os.urandom(32)
+            app_logger.warning('CONSISTENT_SECRETS_KEY not set; per-client secrets will change on restart')
+        Handler.consistent_secrets = ConsistentSecrets(
+            key, ByteLRUCache(config.secret_cache_max_bytes, config.secret_cache_ttl)
+        )
+    else:
+        # Pre-generate fake secrets so handlers only draw from pools
+        init_pools(config.secret_pool_size)
+
+    # Large decoy downloads are built once in the background and streamed from disk
+    if config.decoy_dir:
+        Handler.decoys = init_decoys(config.decoy_dir, config.decoy_file_size, config.decoy_throttle_bytes)
+
+    # Floods and flagged clients are tarpitted per IP instead of all paying the same DELAY
+    if config.rate_limit_rps > 0:
+        Handler.rate_limiter = RateLimiter(
+            config.rate_limit_rps, config.rate_limit_burst, config.rate_limit_max_ips,
+            config.tarpit_slow_after, config.tarpit_error_after, tracker.is_flagged,
+            config.tarpit_max_concurrent
+        )
+        limiter = Handler.rate_limiter
+        get_metrics().registry.register(Gauge(
+            'krawl_rate_limiter_ips', 'IPs held in the rate limiter table', lambda: len(limiter)))
+        get_metrics().registry.register(Gauge(
+            'krawl_tarpitted_requests', 'Requests currently delayed or slowly streamed', lambda: limiter.tarpitted))
+
+    # Crawler-trap pages are deterministic per path, so the next hop can be rendered ahead
+    if config.prerender:
+        Handler.prerenderer = Prerenderer(
+            Handler.render_links, ByteLRUCache(config.prerender_cache_max_bytes, ttl=3600)
+        )
+        cache = Handler.prerenderer.cache
+        get_metrics().registry.register(Gauge(
+            'krawl_prerender_cache_hits', 'Crawler-trap pages served from the pre-render cache',
+            lambda: cache.hits))
+        get_metrics().registry.register(Gauge(
+            'krawl_prerender_cache_misses', 'Crawler-trap pages rendered on the request path',
+            lambda: cache.misses))
+
+    # Wordlists and templates are reloaded in place when they change or on SIGHUP
+    reloader = ContentReloader(config.reload_interval)
+    if Handler.consistent_secrets:
+        reloader.add_listener(Handler.consistent_secrets.cache.clear)
+    else:
+        reloader.add_listener(get_pools().reset)
+
+    # Known ranges are classified before any other work, and the list follows its file
+    if config.ip_lists_file:
+        Handler.ip_lists = IpLists(config.ip_lists_file, config.trusted_proxies)
+        try:
+            Handler.ip_lists.load()
+            app_logger.info(f'Loaded {Handler.ip_lists.index.size} CIDR rules from {config.ip_lists_file}')
+        except (OSError, ValueError) as e:
+            app_logger.error(f'Could not load IP lists, starting with none: {e}')
+        reloader.watch_file(config.ip_lists_file, Handler.ip_lists.load)
+
+    # Accesses are aggregated by ASN and country from a local range database, offline
+    if config.asn_db_file:
+        enricher = IpEnricher(config.asn_db_file, config.asn_cache_size)
+
+        def load_asn_db():
+            try:
+                enricher.load()
+                app_logger.info(f'Loaded {enricher.ranges} IP ranges from {config.asn_db_file}')
+            except (OSError, ValueError) as e:
+                app_logger.error(f'Could not load ASN database, starting without it: {e}')
+
+        # Full databases take seconds to parse; accesses go unenriched until it's in
+        threading.Thread(target=load_asn_db, name='asn-db-loader', daemon=True).start()
+        tracker.enricher = enricher
+        reloader.watch_file(config.asn_db_file, enricher.load)
+        get_metrics().registry.register(Gauge(
+            'krawl_asn_cache_hits', 'ASN/country lookups answered from the per-IP cache',
+            lambda: enricher.cache_info().hits))
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: reloader.trigger())
+    reloader.start()
 
     if len(sys.argv) == 2:
         try:
-            with open(sys.argv[1], 'r') as f:
-                Handler.webpages = f.readlines()
+            # Large page lists are memory-mapped with a persisted line index
+            Handler.webpages = LineStore(sys.argv[1])
 
             if not Handler.webpages:
                 app_logger.warning('The file provided was empty. Using randomly generated links.')
@@ -67,6 +271,9 @@ def main():
         except IOError:
             app_logger.warning("Can't read input file. Using randomly generated links.")
 
+    # Load and compile everything lazily initialized, so first visitors don't pay for it
+    warmup_seconds = warm_up(Handler, tracker)
+
     try:
         app_logger.info(f'Starting deception server on port {config.port}...')
         app_logger.info(f'Dashboard available at: {config.dashboard_secret_path}')
@@ -75,10 +282,21 @@ def main():
         else:
             app_logger.info('No canary token configured (set CANARY_TOKEN_URL to enable)')
 
-        server = HTTPServer(('0.0.0.0', config.port), Handler)
+        if config.metrics_port:
+            start_metrics_server(config.metrics_port, get_metrics())
+            app_logger.info(f'Prometheus metrics available on port {config.metrics_port} at /metrics')
+        if config.metrics_secret_path:
+            app_logger.info(f'Prometheus metrics available at: {config.metrics_secret_path}')
+        if config.debug_secret_path:
+            app_logger.info(f'Instrumentation enabled, debug endpoints at: {config.debug_secret_path}')
+
+        # Threaded so long-lived dashboard live feeds don't block other visitors
+        server = ThreadingHTTPServer(('0.0.0.0', config.port), Handler)
+        get_health().mark_ready(warmup_seconds)
         app_logger.info('Server started. Use <Ctrl-C> to stop.')
         server.serve_forever()
     except KeyboardInterrupt:
+        get_health().mark_not_ready()
         app_logger.info('Stopping server...')
         server.socket.close()
         app_logger.info('Server stopped')
@@ -86,6 +304,19 @@ def main():
         app_logger.error(f'Error starting HTTP server on port {config.port}: {e}')
         app_logger.error(f'Make sure you are root, if needed, and that port {config.port} is open.')
         exit(1)
+    finally:
+        if log_shaper:
+            log_shaper.stop()
+            if log_shaper.suppressed():
+                app_logger.info(f'Access log lines suppressed by log shaping: {log_shaper.suppressed()}')
+        if event_log:
+            event_log.close()
+            if event_log.dropped:
+                app_logger.warning(f'Events dropped due to a full event log queue: {event_log.dropped}')
+        dropped = get_dropped_log_counts()
+        if any(dropped.values()):
+            app_logger.warning(f'Log lines dropped due to a full log queue: {dropped}')
+        shutdown_logging()
 
 
 if __name__ == '__main__':
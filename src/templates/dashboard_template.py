@@ -5,9 +5,18 @@ Dashboard template for viewing honeypot statistics.
 Customize this template to change the dashboard appearance.
 """
 
+import html
+import json
 
-def generate_dashboard(stats: dict) -> str:
-    """Generate dashboard HTML with access statistics"""
+from .template_loader import CompiledTemplate
+
+
+def generate_dashboard(stats: dict, events_path: str = None) -> bytes:
+    """Generate dashboard HTML with access statistics.
+
+    If events_path is given, the page subscribes to the live feed there
+    and updates counters and recent activity tables incrementally.
+    """
     
     # Generate IP rows
     top_ips_rows = '\n'.join([
@@ -45,7 +54,139 @@ def generate_dashboard(stats: dict) -> str:
         for log in stats.get('attack_types', [])[-10:]
     ]) or '<tr><td colspan="4" style="text-align:center;">No attacks detected</td></tr>'
 
-    return f"""<!DOCTYPE html>
+    # Generate captured credentials rows (attacker-supplied, so escaped)
+    credential_rows = '\n'.join([
+        f'<tr><td>{html.escape(log["ip"])}</td><td>{html.escape(log["path"])}</td>'
+        f'<td style="word-break: break-all;">{html.escape(log["credentials"].get("username", ""))}</td>'
+        f'<td style="word-break: break-all;">{html.escape(log["credentials"].get("password", ""))}</td>'
+        f'<td>{log["timestamp"].split("T")[1][:8]}</td></tr>'
+        for log in stats.get('recent_credentials', [])[-10:]
+    ]) or '<tr><td colspan="5" style="text-align:center;">No credentials captured yet</td></tr>'
+
+    # Generate subnet rollup rows
+    top_subnet_rows = '\n'.join([
+        f'<tr><td class="rank">{i+1}</td><td>{subnet}</td><td>{count}</td><td>{ips}</td></tr>'
+        for i, (subnet, count, ips) in enumerate(stats.get('top_subnets', []))
+    ]) or '<tr><td colspan="4" style="text-align:center;">No data</td></tr>'
+
+    # Generate invalid/forged client IP rows (attacker-supplied, so escaped)
+    invalid_ip_counts = stats.get('invalid_ip_counts', {})
+    invalid_ip_rows = '\n'.join([
+        f'<tr><td style="word-break: break-all;">{html.escape(value)}</td></tr>'
+        for value in reversed(stats.get('recent_invalid_ips', []))
+    ]) or '<tr><td style="text-align:center;">No invalid client IPs</td></tr>'
+
+    # Generate ASN and country rows (AS names come from the range database)
+    top_asn_rows = '\n'.join([
+        f'<tr><td class="rank">{i+1}</td><td>{asn}</td><td style="word-break: break-all;">{html.escape(name)}</td><td>{count}</td></tr>'
+        for i, (asn, name, count) in enumerate(stats.get('top_asns', []))
+    ]) or '<tr><td colspan="4" style="text-align:center;">No data</td></tr>'
+
+    top_country_rows = '\n'.join([
+        f'<tr><td class="rank">{i+1}</td><td>{html.escape(country)}</td><td>{count}</td></tr>'
+        for i, (country, count) in enumerate(stats.get('top_countries', []))
+    ]) or '<tr><td colspan="3" style="text-align:center;">No data</td></tr>'
+
+    # Generate timed-out connection rows
+    timeout_rows = '\n'.join([
+        f'<tr><td class="rank">{i+1}</td><td>{ip}</td><td>{count}</td></tr>'
+        for i, (ip, count) in enumerate(stats.get('timeout_ips', []))
+    ]) or '<tr><td colspan="3" style="text-align:center;">No slow clients yet</td></tr>'
+
+    # Generate CIDR list match rows
+    ip_list_rows = '\n'.join([
+        f'<tr><td>{html.escape(label)}</td><td>{action}</td><td>{count}</td></tr>'
+        for label, action, count in stats.get('ip_list_hits', [])
+    ]) or '<tr><td colspan="3" style="text-align:center;">No IP list matches</td></tr>'
+
+    # Generate canary token recipient rows (the IP may come from X-Forwarded-For, so escaped)
+    canary_rows = '\n'.join([
+        f'<tr><td>{html.escape(ip)}</td><td>{count}</td><td>{last.split("T")[1][:8]}</td></tr>'
+        for ip, count, last in stats.get('canary_recipients', [])
+    ]) or '<tr><td colspan="3" style="text-align:center;">No canary tokens served yet</td></tr>'
+
+    live_feed_script = _live_feed_script(events_path) if events_path else ''
+
+    return _DASHBOARD.render(
+        total_accesses=stats['total_accesses'],
+        unique_ips=stats['unique_ips'],
+        unique_paths=stats['unique_paths'],
+        suspicious_accesses=stats['suspicious_accesses'],
+        honeypot_ips=stats.get('honeypot_ips', 0),
+        honeypot_rows=honeypot_rows,
+        suspicious_rows=suspicious_rows,
+        attack_type_rows=attack_type_rows,
+        credential_rows=credential_rows,
+        timeout_rows=timeout_rows,
+        ip_list_rows=ip_list_rows,
+        canary_rows=canary_rows,
+        top_ips_rows=top_ips_rows,
+        top_subnet_rows=top_subnet_rows,
+        invalid_ip_rows=invalid_ip_rows,
+        invalid_ips=stats.get('invalid_ips', 0),
+        invalid_count=invalid_ip_counts.get('invalid', 0),
+        spoofed_count=invalid_ip_counts.get('spoofed', 0),
+        top_asn_rows=top_asn_rows,
+        top_country_rows=top_country_rows,
+        top_paths_rows=top_paths_rows,
+        top_ua_rows=top_ua_rows,
+        live_feed_script=live_feed_script,
+    )
+
+
+def _live_feed_script(events_path: str) -> str:
+    """Client script that applies live feed events to the rendered page"""
+    return f"""<script>
+(function() {{
+    const source = new EventSource({json.dumps(events_path)});
+    const maxRows = 10;
+
+    function setCounters(counters) {{
+        for (const [key, value] of Object.entries(counters)) {{
+            const el = document.getElementById('stat-' + key);
+            if (el) el.textContent = value;
+        }}
+    }}
+
+    function appendRow(tbodyId, cells) {{
+        const tbody = document.getElementById(tbodyId);
+        if (!tbody) return;
+        if (tbody.querySelector('td[colspan]')) tbody.innerHTML = '';
+        const row = document.createElement('tr');
+        for (const text of cells) {{
+            const td = document.createElement('td');
+            td.textContent = text;
+            row.appendChild(td);
+        }}
+        tbody.appendChild(row);
+        while (tbody.rows.length > maxRows) tbody.deleteRow(0);
+    }}
+
+    source.addEventListener('counters', function(e) {{
+        setCounters(JSON.parse(e.data));
+    }});
+
+    source.addEventListener('access', function(e) {{
+        const data = JSON.parse(e.data);
+        const ev = data.event;
+        const time = ev.timestamp.split('T')[1].slice(0, 8);
+        setCounters(data.counters);
+        if (ev.suspicious) {{
+            appendRow('suspicious-rows', [ev.ip, ev.path, ev.user_agent.slice(0, 60), time]);
+        }}
+        if (ev.attack_types.length) {{
+            appendRow('attack-rows', [ev.ip, ev.path, ev.attack_types.join(', '), ev.user_agent.slice(0, 60), time]);
+        }}
+        if (ev.credentials) {{
+            appendRow('credential-rows', [ev.ip, ev.path, ev.credentials.username || '', ev.credentials.password || '', time]);
+        }}
+    }});
+}})();
+</script>"""
+
+
+# Page markup compiled once; only the counters and table rows change per render
+_DASHBOARD = CompiledTemplate("""<!DOCTYPE html>
 <html>
 <head>
     <meta charset="UTF-8">
@@ -140,25 +281,29 @@ def generate_dashboard(stats: dict) -> str:
         
         <div class="stats-grid">
             <div class="stat-card">
-                <div class="stat-value">{stats['total_accesses']}</div>
+                <div class="stat-value" id="stat-total_accesses">{total_accesses}</div>
                 <div class="stat-label">Total Accesses</div>
             </div>
             <div class="stat-card">
-                <div class="stat-value">{stats['unique_ips']}</div>
+                <div class="stat-value" id="stat-unique_ips">{unique_ips}</div>
                 <div class="stat-label">Unique IPs</div>
             </div>
             <div class="stat-card">
-                <div class="stat-value">{stats['unique_paths']}</div>
+                <div class="stat-value" id="stat-unique_paths">{unique_paths}</div>
                 <div class="stat-label">Unique Paths</div>
             </div>
             <div class="stat-card alert">
-                <div class="stat-value alert">{stats['suspicious_accesses']}</div>
+                <div class="stat-value alert" id="stat-suspicious_accesses">{suspicious_accesses}</div>
                 <div class="stat-label">Suspicious Accesses</div>
             </div>
             <div class="stat-card alert">
-                <div class="stat-value alert">{stats.get('honeypot_ips', 0)}</div>
+                <div class="stat-value alert" id="stat-honeypot_ips">{honeypot_ips}</div>
                 <div class="stat-label">Honeypot Caught</div>
             </div>
+            <div class="stat-card alert">
+                <div class="stat-value alert" id="stat-invalid_ips">{invalid_ips}</div>
+                <div class="stat-label">Invalid/Forged IPs</div>
+            </div>
         </div>
 
         <div class="table-container alert-section">
@@ -188,7 +333,7 @@ def generate_dashboard(stats: dict) -> str:
                         <th>Time</th>
                     </tr>
                 </thead>
-                <tbody>
+                <tbody id="suspicious-rows">
                     {suspicious_rows}
                 </tbody>
             </table>
@@ -206,12 +351,30 @@ def generate_dashboard(stats: dict) -> str:
                         <th>Time</th>
                     </tr>
                 </thead>
-                <tbody>
+                <tbody id="attack-rows">
                     {attack_type_rows}
                 </tbody>
             </table>
         </div>
 
+        <div class="table-container alert-section">
+            <h2>&#128273; Captured Credentials</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>IP Address</th>
+                        <th>Path</th>
+                        <th>Username</th>
+                        <th>Password</th>
+                        <th>Time</th>
+                    </tr>
+                </thead>
+                <tbody id="credential-rows">
+                    {credential_rows}
+                </tbody>
+            </table>
+        </div>
+
         <div class="table-container">
             <h2>Top IP Addresses</h2>
             <table>
@@ -228,6 +391,118 @@ def generate_dashboard(stats: dict) -> str:
             </table>
         </div>
 
+        <div class="table-container">
+            <h2>Top Subnets (/24, /48)</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>#</th>
+                        <th>Subnet</th>
+                        <th>Access Count</th>
+                        <th>Distinct IPs</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {top_subnet_rows}
+                </tbody>
+            </table>
+        </div>
+
+        <div class="table-container">
+            <h2>Invalid or Forged Client IPs ({invalid_count} invalid, {spoofed_count} impossible)</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>Recent values</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {invalid_ip_rows}
+                </tbody>
+            </table>
+        </div>
+
+        <div class="table-container">
+            <h2>Top ASNs</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>#</th>
+                        <th>ASN</th>
+                        <th>Network</th>
+                        <th>Access Count</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {top_asn_rows}
+                </tbody>
+            </table>
+        </div>
+
+        <div class="table-container">
+            <h2>Top Countries</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>#</th>
+                        <th>Country</th>
+                        <th>Access Count</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {top_country_rows}
+                </tbody>
+            </table>
+        </div>
+
+        <div class="table-container">
+            <h2>Slow Clients (Timed-out Connections)</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>#</th>
+                        <th>IP Address</th>
+                        <th>Timeouts</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {timeout_rows}
+                </tbody>
+            </table>
+        </div>
+
+        <div class="table-container">
+            <h2>IP List Matches</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>Label</th>
+                        <th>Action</th>
+                        <th>Hits</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {ip_list_rows}
+                </tbody>
+            </table>
+        </div>
+
+        <div class="table-container">
+            <h2>Canary Token Recipients</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>IP Address</th>
+                        <th>Tokens</th>
+                        <th>Last Served</th>
+                    </tr>
+                </thead>
+                <tbody>
+                    {canary_rows}
+                </tbody>
+            </table>
+        </div>
+
         <div class="table-container">
             <h2>Top Paths</h2>
             <table>
@@ -260,6 +535,7 @@ def generate_dashboard(stats: dict) -> str:
             </table>
         </div>
     </div>
+{live_feed_script}
 </body>
 </html>
-"""
+""", 'dashboard')
@@ -2,51 +2,56 @@
 
 """
 HTML templates for the deception server.
-Templates are loaded from the html/ subdirectory.
+Templates are loaded from the html/ subdirectory and compiled to bytes once.
 """
 
-from .template_loader import load_template
+from .template_loader import compile_template
 
 
-def login_form() -> str:
+def login_form() -> bytes:
     """Generate fake login page"""
-    return load_template("login_form")
+    return compile_template("login_form", static=True).render()
 
 
-def login_error() -> str:
+def login_error() -> bytes:
     """Generate fake login error page"""
-    return load_template("login_error")
+    return compile_template("login_error", static=True).render()
 
 
-def wordpress() -> str:
+def wordpress() -> bytes:
     """Generate fake WordPress page"""
-    return load_template("wordpress")
+    return compile_template("wordpress", static=True).render()
 
 
-def phpmyadmin() -> str:
+def phpmyadmin() -> bytes:
     """Generate fake phpMyAdmin page"""
-    return load_template("phpmyadmin")
+    return compile_template("phpmyadmin", static=True).render()
 
 
-def wp_login() -> str:
+def wp_login() -> bytes:
     """Generate fake WordPress login page"""
-    return load_template("wp_login")
+    return compile_template("wp_login", static=True).render()
 
 
-def robots_txt() -> str:
+def robots_txt() -> bytes:
     """Generate juicy robots.txt"""
-    return load_template("robots.txt")
+    return compile_template("robots.txt", static=True).render()
 
 
-def directory_listing(path: str, dirs: list, files: list) -> str:
+def directory_listing(path: str, dirs: list, files: list) -> bytes:
     """Generate fake directory listing"""
-    row_template = load_template("directory_row")
+    row_template = compile_template("directory_row")
 
-    rows = ""
+    rows = bytearray()
     for d in dirs:
-        rows += row_template.format(href=d, name=d, date="2024-12-01 10:30", size="-")
+        row_template.render_into(rows, href=d, name=d, date="2024-12-01 10:30", size="-")
 
     for f, size in files:
-        rows += row_template.format(href=f, name=f, date="2024-12-01 14:22", size=size)
+        row_template.render_into(rows, href=f, name=f, date="2024-12-01 14:22", size=size)
 
-    return load_template("directory_listing", path=path, rows=rows)
+    return compile_template("directory_listing").render(path=path, rows=bytes(rows))
+
+
+def crawler_page(counter, canary: bytes, links: bytes) -> bytes:
+    """Generate a crawler-trap page around pre-rendered links"""
+    return compile_template("crawler_page").render(counter=counter, canary=canary, links=links)
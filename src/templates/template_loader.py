@@ -3,10 +3,13 @@
 """
 Template loader for HTML templates.
 Loads templates from the html/ subdirectory and supports string formatting for dynamic content.
+Templates can also be compiled once into pre-encoded byte segments and
+slots, so rendering only joins bytes instead of re-formatting the whole text.
 """
 
 from pathlib import Path
-from typing import Dict
+from string import Formatter
+from typing import Dict, List
 
 
 class TemplateNotFoundError(Exception):
@@ -14,8 +17,65 @@ class TemplateNotFoundError(Exception):
     pass
 
 
+class CompiledTemplate:
+    """
+    A str.format-style template split into static byte segments and named slots.
+
+    Static text is encoded once at compile time; render() only encodes the
+    slot values and joins. Slot values may be bytes, str, or anything str()-able.
+    Format specs and conversions ({x:>10}, {x!r}) are not supported.
+    A static template is taken literally, like load_template() without kwargs.
+    """
+
+    def __init__(self, text: str, name: str = '<string>', static: bool = False):
+        self.name = name
+        self.static = static
+        self.slots: List[str] = []
+        # Alternating static bytes and slot names: segments[i] precedes slots[i]
+        self.segments: List[bytes] = []
+        if static:
+            self.tail = text.encode('utf-8')
+            return
+        static = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            static.append(literal)
+            if field is None:
+                continue
+            if spec or conversion or not field.isidentifier():
+                raise ValueError(f"Template '{name}': unsupported placeholder {{{field}}}")
+            self.segments.append(''.join(static).encode('utf-8'))
+            self.slots.append(field)
+            static = []
+        self.tail = ''.join(static).encode('utf-8')
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode('utf-8')
+
+    def render(self, **kwargs) -> bytes:
+        """Render to bytes; a template without slots returns its cached bytes"""
+        if not self.slots:
+            return self.tail
+        parts = []
+        for segment, slot in zip(self.segments, self.slots):
+            parts.append(segment)
+            parts.append(self._encode(kwargs[slot]))
+        parts.append(self.tail)
+        return b''.join(parts)
+
+    def render_into(self, buffer: bytearray, **kwargs) -> None:
+        """Append the rendered template to a writable buffer"""
+        for segment, slot in zip(self.segments, self.slots):
+            buffer += segment
+            buffer += self._encode(kwargs[slot])
+        buffer += self.tail
+
+
 # Module-level cache for loaded templates
 _template_cache: Dict[str, str] = {}
+_compiled_cache: Dict[str, CompiledTemplate] = {}
 
 # Base directory for template files
 _TEMPLATE_DIR = Path(__file__).parent / "html"
@@ -43,27 +103,70 @@ def load_template(name: str, **kwargs) -> str:
     # debug
     # print(f"Loading Template: {name}")
     
+    template = _read_template(name)
+
+    # Apply substitutions if kwargs provided
+    if kwargs:
+        template = template.format(**kwargs)
+    return template
+
+
+def compile_template(name: str, static: bool = False) -> CompiledTemplate:
+    """
+    Load and compile a template by name, caching the compiled form.
+    Static templates have no placeholders and are served as-is.
+
+    Example:
+        >>> compile_template("directory_row").render(href="a/", name="a/", date="-", size="-")
+    """
+    compiled = _compiled_cache.get(name)
+    if compiled is None:
+        compiled = CompiledTemplate(_read_template(name), name, static)
+        _compiled_cache[name] = compiled
+    return compiled
+
+
+def _read_template(name: str) -> str:
+    """Raw template text, read from disk on first use"""
     # Check cache first
     if name not in _template_cache:
-        # Determine file path based on whether name has an extension
-        if '.' in name:
-            file_path = _TEMPLATE_DIR / name
-        else:
-            file_path = _TEMPLATE_DIR / f"{name}.html"
-
+        file_path = _template_path(name)
         if not file_path.exists():
             raise TemplateNotFoundError(f"Template '{name}' not found at {file_path}")
 
         _template_cache[name] = file_path.read_text(encoding='utf-8')
 
-    template = _template_cache[name]
+    return _template_cache[name]
 
-    # Apply substitutions if kwargs provided
-    if kwargs:
-        template = template.format(**kwargs)
-    return template
+
+def template_files() -> List[Path]:
+    """Every template file under the template directory"""
+    return sorted(p for p in _TEMPLATE_DIR.iterdir() if p.is_file())
+
+
+def reload_templates() -> None:
+    """
+    Re-read every cached template from disk and swap the caches in one step.
+
+    Templates are recompiled before the swap; if any file is missing or no
+    longer compiles, the error propagates and the current templates stay live.
+    """
+    global _template_cache, _compiled_cache
+    current = list(_compiled_cache.items())
+    names = set(_template_cache) | {name for name, _ in current}
+    texts = {name: _template_path(name).read_text(encoding='utf-8') for name in names}
+    compiled = {name: CompiledTemplate(texts[name], name, template.static) for name, template in current}
+    _template_cache, _compiled_cache = texts, compiled
+
+
+def _template_path(name: str) -> Path:
+    # Determine file path based on whether name has an extension
+    if '.' in name:
+        return _TEMPLATE_DIR / name
+    return _TEMPLATE_DIR / f"{name}.html"
 
 
 def clear_cache() -> None:
     """Clear the template cache. Useful for testing or development."""
     _template_cache.clear()
+    _compiled_cache.clear()
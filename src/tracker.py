@@ -1,15 +1,37 @@
 #!/usr/bin/env python3
 
-from typing import Dict, List, Tuple
-from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import defaultdict, deque
 from datetime import datetime
 import re
+import threading
+
+from ip_enrichment import IpEnricher
+from ipkeys import format_subnet, is_impossible_source, pack_ip, subnet_key, unpack_ip
+
+
+# Longest invalid client IP value kept for display
+MAX_INVALID_IP_CHARS = 64
 
 
 class AccessTracker:
-    """Track IP addresses and paths accessed"""
-    def __init__(self):
-        self.ip_counts: Dict[str, int] = defaultdict(int)
+    """Track IP addresses and paths accessed.
+
+    Per-IP tables are keyed by packed integer IPs (see ipkeys), parsed and
+    validated once per access, with /24 and /48 subnet rollups alongside.
+    keep_log=False keeps only the aggregates, not every entry (offline ingestion).
+    """
+    # Aggregates carried by export_aggregates/merge_aggregates, besides the per-IP sets and lists
+    _MERGED_COUNTS = ('ip_counts', 'path_counts', 'user_agent_counts', 'timeout_counts',
+                      'subnet_counts', 'asn_counts', 'country_counts')
+    _MERGED_TOTALS = ('access_count', 'suspicious_count', 'honeypot_count', 'timeout_total',
+                      'invalid_ip_count', 'spoofed_ip_count')
+    _MERGED_RECENT = ('recent_suspicious', 'recent_attacks', 'recent_credentials', 'recent_invalid_ips')
+
+    def __init__(self, keep_log: bool = True):
+        self.keep_log = keep_log
+        self.access_count = 0
+        self.ip_counts: Dict[int, int] = defaultdict(int)
         self.path_counts: Dict[str, int] = defaultdict(int)
         self.user_agent_counts: Dict[str, int] = defaultdict(int)
         self.access_log: List[Dict] = []
@@ -29,38 +51,188 @@ class AccessTracker:
         }
 
         # Track IPs that accessed honeypot paths from robots.txt
-        self.honeypot_triggered: Dict[str, List[str]] = defaultdict(list)
-
-    def record_access(self, ip: str, path: str, user_agent: str = '', body: str = ''):
-        """Record an access attempt"""
-        self.ip_counts[ip] += 1
-        self.path_counts[path] += 1
-        if user_agent:
-            self.user_agent_counts[user_agent] += 1
-        
+        self.honeypot_triggered: Dict[int, List[str]] = defaultdict(list)
+
+        # Running totals and recent windows so stats don't rescan access_log
+        self.suspicious_count = 0
+        self.honeypot_count = 0
+        self.recent_suspicious: deque = deque(maxlen=100)
+        self.recent_attacks: deque = deque(maxlen=100)
+        self.recent_credentials: deque = deque(maxlen=100)
+
+        # Connections dropped for being too slow (slowloris-style), per IP
+        self.timeout_counts: Dict[int, int] = defaultdict(int)
+        self.timeout_total = 0
+
+        # IPs whose requests matched an attack pattern
+        self.attack_ips = set()
+
+        # Accesses and distinct IPs per /24 (IPv4) or /48 (IPv6), to expose distributed scans
+        self.subnet_counts: Dict[int, int] = defaultdict(int)
+        self.subnet_ips: Dict[int, int] = defaultdict(int)
+
+        # Client IPs that aren't addresses at all, or that no real peer could have
+        # (forged X-Forwarded-For); counted here instead of in the per-IP tables
+        self.invalid_ip_count = 0
+        self.spoofed_ip_count = 0
+        self.recent_invalid_ips: deque = deque(maxlen=20)
+
+        # Accesses per ASN and country, when an offline range database is loaded
+        self.enricher: Optional[IpEnricher] = None
+        self.asn_counts: Dict[str, int] = defaultdict(int)
+        self.as_names: Dict[str, str] = {}
+        self.country_counts: Dict[str, int] = defaultdict(int)
+
+        # Callbacks notified with every new access log entry (live feed, sinks)
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[Dict], None]) -> None:
+        """Register a callback invoked with each recorded access entry"""
+        self._listeners.append(listener)
+
+    def record_access(self, ip: str, path: str, user_agent: str = '', body: str = '',
+                      body_attacks: Optional[List[str]] = None,
+                      credentials: Optional[Dict[str, str]] = None,
+                      ip_label: Optional[str] = None, timestamp: Optional[str] = None):
+        """Record an access attempt.
+
+        A streamed body is passed already scanned as body_attacks (see
+        body_ingest.BodyIngestor) instead of as text. ip_label tags clients
+        matching a 'known' CIDR rule (see ip_lists). timestamp (ISO format)
+        defaults to now; offline ingestion passes the logged time.
+        """
         # path attack type detection
         attack_findings = self.detect_attack_type(path)
 
         # post / put data
-        if len(body) > 0:
+        if body_attacks is not None:
+            attack_findings.extend(name for name in body_attacks if name not in attack_findings)
+        elif len(body) > 0:
             attack_findings.extend(self.detect_attack_type(body))
 
-        is_suspicious = self.is_suspicious_user_agent(user_agent) or self.is_honeypot_path(path) or len(attack_findings) > 0
+        is_honeypot = self.is_honeypot_path(path)
+        is_suspicious = self.is_suspicious_user_agent(user_agent) or is_honeypot or len(attack_findings) > 0
 
-        
-        # Track if this IP accessed a honeypot path
-        if self.is_honeypot_path(path):
-            self.honeypot_triggered[ip].append(path)
-        
-        self.access_log.append({
+        entry = {
             'ip': ip,
             'path': path,
             'user_agent': user_agent,
             'suspicious': is_suspicious,
-            'honeypot_triggered': self.is_honeypot_path(path),
+            'honeypot_triggered': is_honeypot,
             'attack_types':attack_findings,
-            'timestamp': datetime.now().isoformat()
-        })
+            'timestamp': timestamp or datetime.now().isoformat()
+        }
+        if credentials:
+            entry['credentials'] = credentials
+        if ip_label:
+            entry['ip_list'] = ip_label
+        key = pack_ip(ip)
+        if key is None or is_impossible_source(key):
+            entry['ip'] = ip[:MAX_INVALID_IP_CHARS]
+            entry['ip_invalid'] = True
+            ip_info = None
+        else:
+            ip_info = self.enricher.lookup(ip) if self.enricher else None
+        if ip_info:
+            entry['asn'] = ip_info.asn
+            entry['country'] = ip_info.country
+
+        with self._lock:
+            if 'ip_invalid' in entry:
+                if key is None:
+                    self.invalid_ip_count += 1
+                else:
+                    self.spoofed_ip_count += 1
+                self.recent_invalid_ips.append(entry['ip'])
+                key = None
+            else:
+                subnet = subnet_key(key)
+                if key not in self.ip_counts:
+                    self.subnet_ips[subnet] += 1
+                self.ip_counts[key] += 1
+                self.subnet_counts[subnet] += 1
+            self.path_counts[path] += 1
+            if user_agent:
+                self.user_agent_counts[user_agent] += 1
+
+            # Track if this IP accessed a honeypot path
+            if is_honeypot:
+                if key is not None:
+                    self.honeypot_triggered[key].append(path)
+                self.honeypot_count += 1
+
+            if is_suspicious:
+                self.suspicious_count += 1
+                self.recent_suspicious.append(entry)
+            if attack_findings:
+                self.recent_attacks.append(entry)
+                if key is not None:
+                    self.attack_ips.add(key)
+            if credentials:
+                self.recent_credentials.append(entry)
+            if ip_info:
+                self.asn_counts[ip_info.asn] += 1
+                self.as_names[ip_info.asn] = ip_info.as_name
+                self.country_counts[ip_info.country] += 1
+
+            self.access_count += 1
+            if self.keep_log:
+                self.access_log.append(entry)
+
+        for listener in self._listeners:
+            listener(entry)
+
+    def export_aggregates(self) -> Dict:
+        """Picklable copy of the running aggregates (not the access log), for merge_aggregates"""
+        with self._lock:
+            data = {name: dict(getattr(self, name)) for name in self._MERGED_COUNTS}
+            data.update({name: getattr(self, name) for name in self._MERGED_TOTALS})
+            data.update({name: list(getattr(self, name)) for name in self._MERGED_RECENT})
+            data['honeypot_triggered'] = dict(self.honeypot_triggered)
+            data['attack_ips'] = set(self.attack_ips)
+            data['as_names'] = dict(self.as_names)
+        return data
+
+    def merge_aggregates(self, data: Dict) -> None:
+        """Add aggregates exported by another tracker (e.g. a batch of offline logs) into this one"""
+        with self._lock:
+            # Distinct IPs per subnet only grow by IPs this tracker hasn't seen
+            for key in data['ip_counts']:
+                if key not in self.ip_counts:
+                    self.subnet_ips[subnet_key(key)] += 1
+            for name in self._MERGED_COUNTS:
+                counts = getattr(self, name)
+                for key, count in data[name].items():
+                    counts[key] += count
+            for name in self._MERGED_TOTALS:
+                setattr(self, name, getattr(self, name) + data[name])
+            for name in self._MERGED_RECENT:
+                recent = getattr(self, name)
+                merged = list(recent) + data[name]
+                if merged and isinstance(merged[0], dict):
+                    merged.sort(key=lambda entry: entry['timestamp'])
+                recent.clear()
+                recent.extend(merged)
+            for key, paths in data['honeypot_triggered'].items():
+                self.honeypot_triggered[key].extend(paths)
+            self.attack_ips |= data['attack_ips']
+            self.as_names.update(data['as_names'])
+
+    def record_timeout(self, ip: str, phase: str) -> None:
+        """Record a connection from ip that timed out while sending phase"""
+        key = pack_ip(ip)
+        with self._lock:
+            if key is not None:
+                self.timeout_counts[key] += 1
+            self.timeout_total += 1
+
+    def is_flagged(self, ip: str) -> bool:
+        """Whether ip has hit a honeypot path, sent an attack pattern or stalled a connection"""
+        key = pack_ip(ip)
+        if key is None:
+            return False
+        return key in self.honeypot_triggered or key in self.attack_ips or key in self.timeout_counts
 
     def detect_attack_type(self, data:str) -> list[str]:
         """
@@ -106,7 +278,27 @@ class AccessTracker:
 
     def get_top_ips(self, limit: int = 10) -> List[Tuple[str, int]]:
         """Get top N IP addresses by access count"""
-        return sorted(self.ip_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+        top = sorted(self.ip_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+        return [(unpack_ip(key), count) for key, count in top]
+
+    def get_top_timeout_ips(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Get top N IP addresses by timed-out connections"""
+        top = sorted(self.timeout_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+        return [(unpack_ip(key), count) for key, count in top]
+
+    def get_top_subnets(self, limit: int = 10) -> List[Tuple[str, int, int]]:
+        """Get top N (/24 or /48 subnet, access count, distinct IPs)"""
+        top = sorted(self.subnet_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+        return [(format_subnet(key), count, self.subnet_ips[key]) for key, count in top]
+
+    def get_top_asns(self, limit: int = 10) -> List[Tuple[str, str, int]]:
+        """Get top N (ASN, AS name, access count)"""
+        top = sorted(self.asn_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+        return [(asn, self.as_names.get(asn, ''), count) for asn, count in top]
+
+    def get_top_countries(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """Get top N countries by access count"""
+        return sorted(self.country_counts.items(), key=lambda x: x[1], reverse=True)[:limit]
 
     def get_top_paths(self, limit: int = 10) -> List[Tuple[str, int]]:
         """Get top N paths by access count"""
@@ -118,33 +310,49 @@ class AccessTracker:
 
     def get_suspicious_accesses(self, limit: int = 20) -> List[Dict]:
         """Get recent suspicious accesses"""
-        suspicious = [log for log in self.access_log if log.get('suspicious', False)]
-        return suspicious[-limit:]
+        return list(self.recent_suspicious)[-limit:]
 
     def get_attack_type_accesses(self, limit: int = 20) -> List[Dict]:
         """Get recent accesses with detected attack types"""
-        attacks = [log for log in self.access_log if log.get('attack_types')]
-        return attacks[-limit:]
+        return list(self.recent_attacks)[-limit:]
+
+    def get_credential_attempts(self, limit: int = 20) -> List[Dict]:
+        """Get recent accesses that submitted credentials"""
+        return list(self.recent_credentials)[-limit:]
 
     def get_honeypot_triggered_ips(self) -> List[Tuple[str, List[str]]]:
         """Get IPs that accessed honeypot paths"""
-        return [(ip, paths) for ip, paths in self.honeypot_triggered.items()]
+        return [(unpack_ip(key), paths) for key, paths in self.honeypot_triggered.items()]
 
-    def get_stats(self) -> Dict:
-        """Get statistics summary"""
-        suspicious_count = sum(1 for log in self.access_log if log.get('suspicious', False))
-        honeypot_count = sum(1 for log in self.access_log if log.get('honeypot_triggered', False))
+    def get_counters(self) -> Dict:
+        """Get the headline counters in constant time"""
         return {
-            'total_accesses': len(self.access_log),
+            'total_accesses': self.access_count,
             'unique_ips': len(self.ip_counts),
             'unique_paths': len(self.path_counts),
-            'suspicious_accesses': suspicious_count,
-            'honeypot_triggered': honeypot_count,
+            'suspicious_accesses': self.suspicious_count,
+            'honeypot_triggered': self.honeypot_count,
             'honeypot_ips': len(self.honeypot_triggered),
+            'timeouts': self.timeout_total,
+            'unique_subnets': len(self.subnet_counts),
+            'invalid_ips': self.invalid_ip_count + self.spoofed_ip_count,
+        }
+
+    def get_stats(self) -> Dict:
+        """Get statistics summary"""
+        return {
+            **self.get_counters(),
             'top_ips': self.get_top_ips(10),
             'top_paths': self.get_top_paths(10),
             'top_user_agents': self.get_top_user_agents(10),
             'recent_suspicious': self.get_suspicious_accesses(20),
             'honeypot_triggered_ips': self.get_honeypot_triggered_ips(),
-            'attack_types': self.get_attack_type_accesses(20)
+            'attack_types': self.get_attack_type_accesses(20),
+            'recent_credentials': self.get_credential_attempts(20),
+            'timeout_ips': self.get_top_timeout_ips(10),
+            'top_asns': self.get_top_asns(10),
+            'top_countries': self.get_top_countries(10),
+            'top_subnets': self.get_top_subnets(10),
+            'invalid_ip_counts': {'invalid': self.invalid_ip_count, 'spoofed': self.spoofed_ip_count},
+            'recent_invalid_ips': list(self.recent_invalid_ips)
         }
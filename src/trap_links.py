@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+Link generation for crawler-trap pages.
+Links are derived from a SHAKE-256 stream of the request path instead of
+reseeding the global random module, so a page is byte-identical every time
+its path is requested, generation is thread-safe, and other generators'
+randomness is left untouched. Random characters are produced in bulk by
+translating the digest through a lookup table.
+"""
+
+import hashlib
+import random
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+from urllib.parse import urljoin
+
+
+def _number(stream: bytes, offset: int, low: int, high: int) -> int:
+    """An integer in [low, high] from four bytes of the stream"""
+    return low + int.from_bytes(stream[offset:offset + 4], 'big') % (high - low + 1)
+
+
+@lru_cache(maxsize=8)
+def _char_table(char_space: str) -> Optional[Tuple[bytes, bytes]]:
+    """bytes.translate table mapping digest bytes uniformly onto char_space.
+
+    Byte values past the largest multiple of len(char_space) are deleted so
+    no character is favoured. None if char_space is not plain ASCII.
+    """
+    if not char_space or len(char_space) > 128 or not char_space.isascii():
+        return None
+    usable = 256 - 256 % len(char_space)
+    table = (char_space.encode() * (usable // len(char_space))).ljust(256, b'\0')
+    return table, bytes(range(usable, 256))
+
+
+def _random_chars(seed: bytes, offset: int, count: int, char_space: str) -> str:
+    """count characters of char_space derived deterministically from seed"""
+    translation = _char_table(char_space)
+    if translation is None:
+        return ''.join(random.Random(seed).choices(char_space, k=count))
+    table, delete = translation
+    # Deleted bytes shrink the output, so over-draw; digest(n) is a prefix of digest(2n)
+    size = offset + count * 2 + 64
+    while True:
+        chars = hashlib.shake_256(seed).digest(size)[offset:].translate(table, delete)
+        if len(chars) >= count:
+            return chars[:count].decode()
+        size *= 2
+
+
+def trap_addresses(seed: str, char_space: str, length_range: Tuple[int, int],
+                   count_range: Tuple[int, int], webpages: Optional[Sequence[str]] = None) -> List[str]:
+    """The link targets of the crawler-trap page for seed"""
+    key = seed.encode('utf-8', 'surrogateescape')
+    max_count = count_range[1]
+    header = hashlib.shake_256(key).digest(4 + 8 * max_count)
+    count = _number(header, 0, *count_range)
+
+    if webpages:
+        return [webpages[int.from_bytes(header[4 + 8 * i:12 + 8 * i], 'big') % len(webpages)]
+                for i in range(count)]
+
+    lengths = [_number(header, 4 + 4 * i, *length_range) for i in range(count)]
+    chars = _random_chars(key, len(header), sum(lengths), char_space)
+    addresses = []
+    position = 0
+    for length in lengths:
+        addresses.append(chars[position:position + length])
+        position += length
+    return addresses
+
+
+def child_paths(seed: str, addresses: List[str]) -> Tuple[str, ...]:
+    """Absolute paths the links on the page for seed resolve to (same-site only)"""
+    base = seed.split('?', 1)[0].split('#', 1)[0]
+    base = base[:base.rfind('/') + 1] or '/'
+    children = []
+    for address in addresses:
+        if address.startswith('/') and not address.startswith('//'):
+            children.append(address)
+        elif address and address[0] not in './?#' and ':' not in address:
+            # Plain relative name, as generated links always are
+            children.append(base + address)
+        else:
+            child = urljoin(seed, address)
+            if child.startswith('/') and not child.startswith('//'):
+                children.append(child)
+    return tuple(children)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+"""
+Startup warm-up.
+Wordlists, templates, fake-data pools, attack-pattern regexes and the
+dashboard are otherwise loaded and compiled on first use, so the first
+requests after a rollout or scale-up pay for it. warm_up() does that work
+once, before the server reports ready.
+"""
+
+import time
+from typing import Callable, List, Tuple
+
+from logger import get_app_logger
+from templates import html_templates
+from templates.dashboard_template import generate_dashboard
+from wordlists import get_wordlists
+
+
+# One path per branch of Handler.special_path_response
+WARMUP_PATHS = [
+    '/robots.txt', '/credentials.txt', '/passwords.txt', '/users.json', '/api_keys.json', '/config.json',
+    '/admin', '/wp-login.php', '/wp-content/', '/phpmyadmin/', '/api/users', '/api/v1/status', '/backup/',
+]
+# Per-client secret pages rendered during warm-up are cached under this address
+WARMUP_CLIENT = '127.0.0.1'
+WARMUP_PAYLOADS = ["/index.php?id=1' UNION SELECT 1--", '/../../etc/passwd', '/?q=<script>', '/wp-admin']
+
+
+def _templates() -> None:
+    for render in (html_templates.login_form, html_templates.login_error, html_templates.wordpress,
+                   html_templates.phpmyadmin, html_templates.wp_login, html_templates.robots_txt):
+        render()
+    html_templates.directory_listing('/warmup/', ['a/'], [('b.txt', '1 KB')])
+
+
+def _routes(handler) -> None:
+    for path in WARMUP_PATHS:
+        handler.special_path_response(path, WARMUP_CLIENT)
+
+
+def _detectors(tracker) -> None:
+    for payload in WARMUP_PAYLOADS:
+        tracker.detect_attack_type(payload)
+        tracker.is_honeypot_path(payload)
+    tracker.is_suspicious_user_agent('warmup')
+
+
+def warm_up(handler_class, tracker) -> float:
+    """Load and compile everything first requests would otherwise pay for; returns seconds taken.
+
+    A failing step is logged and skipped: the request that needs it will
+    fail the same way it would have without warm-up.
+    """
+    app_logger = get_app_logger()
+    # generate_page and special_path_response only need class-level state
+    handler = handler_class.__new__(handler_class)
+    steps: List[Tuple[str, Callable[[], object]]] = [
+        ('wordlists', lambda: get_wordlists().preload()),
+        ('templates', _templates),
+        ('routes', lambda: _routes(handler)),
+        ('crawler page', lambda: handler.generate_page('/', handler.config.canary_token_tries)),
+        ('detectors', lambda: _detectors(tracker)),
+        ('dashboard', lambda: generate_dashboard(tracker.get_stats())),
+    ]
+
+    start = time.perf_counter()
+    timings = []
+    for name, step in steps:
+        step_start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            app_logger.error(f'Warm-up step {name} failed: {e}')
+        timings.append(f'{name} {(time.perf_counter() - step_start) * 1000:.1f}ms')
+    elapsed = time.perf_counter() - start
+    app_logger.info(f'Warm-up finished in {elapsed * 1000:.1f}ms ({", ".join(timings)})')
+    return elapsed
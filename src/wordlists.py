@@ -3,23 +3,34 @@
 """
 Wordlists loader - reads all wordlists from wordlists.json
 This allows easy customization without touching Python code.
+Any list may instead be given as the path of a newline-delimited file
+(relative to wordlists.json), which is served from an mmap-backed LineStore
+so multi-million line corpora don't have to be loaded into memory.
 """
 
 import json
+import os
 from pathlib import Path
+from typing import List, Optional
 
+from line_store import LineStore
 from logger import get_app_logger
 
 
+WORDLISTS_PATH = Path(os.getenv('WORDLISTS_FILE') or Path(__file__).parent.parent / 'wordlists.json')
+
+
 class Wordlists:
     """Loads and provides access to wordlists from wordlists.json"""
     
-    def __init__(self):
-        self._data = self._load_config()
+    def __init__(self, data: Optional[dict] = None):
+        self._config_path = WORDLISTS_PATH
+        self._stores = {}
+        self._data = self._load_config() if data is None else data
     
     def _load_config(self):
         """Load wordlists from JSON file"""
-        config_path = Path(__file__).parent.parent / 'wordlists.json'
+        config_path = self._config_path
 
         try:
             with open(config_path, 'r') as f:
@@ -60,53 +71,85 @@ class Wordlists:
             }
         }
     
+    def _list(self, section, key):
+        """A wordlist from the JSON, or a LineStore if it names a file"""
+        value = self._data.get(section, {}).get(key, [])
+        if not isinstance(value, str):
+            return value
+        store = self._stores.get(value)
+        if store is None:
+            try:
+                store = LineStore(str(self._config_path.parent / value))
+            except OSError as e:
+                get_app_logger().warning(f"Can't open wordlist file {value}: {e}")
+                store = []
+            self._stores[value] = store
+        return store
+
+    def _file_values(self) -> List[str]:
+        return [
+            value
+            for section in self._data.values() if isinstance(section, dict)
+            for value in section.values() if isinstance(value, str)
+        ]
+
+    def files(self) -> List[str]:
+        """Paths of the line-store files this wordlist set refers to"""
+        return [str(self._config_path.parent / value) for value in self._file_values()]
+
+    def preload(self) -> None:
+        """Open every referenced line store now, raising OSError if one can't be read"""
+        for value in self._file_values():
+            if value not in self._stores:
+                self._stores[value] = LineStore(str(self._config_path.parent / value))
+
     @property
     def username_prefixes(self):
-        return self._data.get("usernames", {}).get("prefixes", [])
+        return self._list("usernames", "prefixes")
     
     @property
     def username_suffixes(self):
-        return self._data.get("usernames", {}).get("suffixes", [])
+        return self._list("usernames", "suffixes")
     
     @property
     def password_prefixes(self):
-        return self._data.get("passwords", {}).get("prefixes", [])
+        return self._list("passwords", "prefixes")
     
     @property
     def simple_passwords(self):
-        return self._data.get("passwords", {}).get("simple", [])
+        return self._list("passwords", "simple")
     
     @property
     def email_domains(self):
-        return self._data.get("emails", {}).get("domains", [])
+        return self._list("emails", "domains")
     
     @property
     def api_key_prefixes(self):
-        return self._data.get("api_keys", {}).get("prefixes", [])
+        return self._list("api_keys", "prefixes")
     
     @property
     def database_names(self):
-        return self._data.get("databases", {}).get("names", [])
+        return self._list("databases", "names")
     
     @property
     def database_hosts(self):
-        return self._data.get("databases", {}).get("hosts", [])
+        return self._list("databases", "hosts")
     
     @property
     def application_names(self):
-        return self._data.get("applications", {}).get("names", [])
+        return self._list("applications", "names")
     
     @property
     def user_roles(self):
-        return self._data.get("users", {}).get("roles", [])
+        return self._list("users", "roles")
     
     @property
     def directory_files(self):
-        return self._data.get("directory_listing", {}).get("files", [])
+        return self._list("directory_listing", "files")
     
     @property
     def directory_dirs(self):
-        return self._data.get("directory_listing", {}).get("directories", [])
+        return self._list("directory_listing", "directories")
     
     @property
     def error_codes(self):
@@ -122,3 +165,42 @@ def get_wordlists():
         _wordlists_instance = Wordlists()
     return _wordlists_instance
 
+
+def validate_wordlists(data) -> None:
+    """Raise ValueError unless data has the shape wordlists.json must have"""
+    if not isinstance(data, dict):
+        raise ValueError("top level must be an object")
+    for name, section in data.items():
+        if name == "error_codes":
+            if not isinstance(section, list) or not all(isinstance(c, int) for c in section):
+                raise ValueError("error_codes must be a list of integers")
+            continue
+        if not isinstance(section, dict):
+            raise ValueError(f"section '{name}' must be an object")
+        for key, value in section.items():
+            if isinstance(value, str):
+                continue
+            if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+                raise ValueError(f"'{name}.{key}' must be a list of strings or a file path")
+
+
+def reload_wordlists() -> Wordlists:
+    """Load wordlists.json into a new instance and swap it in.
+
+    The file is validated and every referenced line store is opened first,
+    so on any error (raised as ValueError or OSError) the current wordlists
+    stay in place.
+    """
+    global _wordlists_instance
+    with open(WORDLISTS_PATH, 'r') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e}") from e
+    validate_wordlists(data)
+    wordlists = Wordlists(data)
+    # Opening (and indexing) line stores here keeps that work off the request path
+    wordlists.preload()
+    _wordlists_instance = wordlists
+    return wordlists
+
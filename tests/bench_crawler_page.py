@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark crawler-trap page generation: the legacy implementation (global
+random.seed, per-character random.choice, HTML grown with +=) against the
+current one (SHAKE-256 derived links, compiled byte template).
+
+Also checks that the current generator is byte-identical per path across
+repeated and concurrent calls and leaves the global random state alone.
+
+    python3 tests/bench_crawler_page.py [ITERATIONS]
+"""
+
+import os
+import random
+import sys
+import timeit
+from itertools import cycle
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from config import Config  # noqa: E402
+from handler import Handler  # noqa: E402
+from templates.template_loader import load_template  # noqa: E402
+
+
+PATHS = [f'/{"".join(random.choices("abcdefghijklmnop", k=10))}' for _ in range(256)]
+
+
+def legacy_page(config: Config, seed: str, counter: int) -> bytes:
+    """generate_page as it was before links were derived from the path hash"""
+    page = load_template('crawler_page')
+    head, _, tail = page.partition('{canary}{links}')
+    random.seed(seed)
+    num_pages = random.randint(*config.links_per_page_range)
+    html = head.format(counter=counter).replace('{{', '{').replace('}}', '}')
+    for _ in range(num_pages):
+        address = ''.join([
+            random.choice(config.char_space)
+            for _ in range(random.randint(*config.links_length_range))
+        ])
+        html += f"""
+            <div class="link-box">
+                <a href="{address}">{address}</a>
+            </div>
+"""
+    html += tail
+    return html.encode()
+
+
+# generate_page only needs class-level state, so skip the socket setup
+_handler = Handler.__new__(Handler)
+
+
+def current_page(seed: str) -> bytes:
+    return _handler.generate_page(seed, Handler.config.canary_token_tries)
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    config = Config.from_env()
+    Handler.config = config
+
+    state = random.getstate()
+    expected = {path: current_page(path) for path in PATHS}
+    assert random.getstate() == state, 'current generator touched the global random state'
+    assert all(current_page(path) == page for path, page in expected.items()), 'not deterministic'
+    with ThreadPoolExecutor(8) as pool:
+        for _ in range(4):
+            pages = list(pool.map(current_page, PATHS))
+            assert pages == [expected[path] for path in PATHS], 'not deterministic under concurrency'
+    print(f'determinism: ok ({len(PATHS)} paths, sequential and 8 threads)')
+
+    paths = cycle(PATHS)
+    legacy = min(timeit.repeat(lambda: legacy_page(config, next(paths), config.canary_token_tries),
+                               number=iterations, repeat=3))
+    current = min(timeit.repeat(lambda: current_page(next(paths)), number=iterations, repeat=3))
+
+    print(f'legacy:  {legacy / iterations * 1e6:8.2f} us/page')
+    print(f'current: {current / iterations * 1e6:8.2f} us/page  ({legacy / current:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
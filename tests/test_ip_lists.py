@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+"""IP list rules must apply to the connecting peer, not to a client-supplied X-Forwarded-For"""
+
+import os
+import sys
+import tempfile
+import unittest
+from email.message import Message
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from handler import Handler  # noqa: E402
+from ip_lists import IpLists  # noqa: E402
+
+
+RULES = """
+10.0.0.0/8        allow   internal
+198.51.100.0/24   block   scanner
+"""
+
+
+def make_lists(trusted_proxies: str = '') -> IpLists:
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        f.write(RULES)
+    try:
+        lists = IpLists(f.name, trusted_proxies)
+        lists.load()
+    finally:
+        os.unlink(f.name)
+    return lists
+
+
+def make_handler(peer: str, forwarded_for: str, lists: IpLists) -> Handler:
+    # check_ip_lists only needs the peer, the headers and class-level state
+    handler = Handler.__new__(Handler)
+    handler.client_address = (peer, 40000)
+    handler.headers = Message()
+    handler.headers['X-Forwarded-For'] = forwarded_for
+    handler.ip_lists = lists
+    return handler
+
+
+class SpoofedForwardedForTest(unittest.TestCase):
+
+    def test_spoofed_header_does_not_reach_allow_rule(self):
+        handler = make_handler('203.0.113.5', '10.1.2.3', make_lists())
+        self.assertIsNone(handler.check_ip_lists())
+
+    def test_spoofed_header_does_not_dodge_block_rule(self):
+        handler = make_handler('198.51.100.7', '203.0.113.5', make_lists())
+        sent = []
+        handler.send_response = sent.append
+        handler.send_header = lambda name, value: None
+        handler.end_headers = lambda: None
+        self.assertEqual(handler.check_ip_lists(), 'block')
+        self.assertEqual(sent, [403])
+        self.assertEqual(handler.ip_lists.hits(), [('scanner', 'block', 1)])
+
+    def test_spoofed_hop_left_of_trusted_proxy_is_ignored(self):
+        # The client sent "10.1.2.3", the trusted proxy appended the address it saw
+        handler = make_handler('172.16.0.2', '10.1.2.3, 203.0.113.5', make_lists('172.16.0.0/12'))
+        self.assertIsNone(handler.check_ip_lists())
+
+    def test_trusted_proxy_header_is_used(self):
+        lists = make_lists('172.16.0.0/12')
+        self.assertEqual(lists.client_ip('172.16.0.2', '10.1.2.3'), '10.1.2.3')
+        self.assertEqual(lists.match(lists.client_ip('172.16.0.2', '198.51.100.9')), ('block', 'scanner'))
+
+
+if __name__ == '__main__':
+    unittest.main()
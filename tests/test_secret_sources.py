@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+"""Which source serves the fake secrets: per-client derivation by default, the pools only when it's off"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import pools  # noqa: E402
+from cache import ByteLRUCache  # noqa: E402
+from config import Config  # noqa: E402
+from consistent_secrets import ConsistentSecrets  # noqa: E402
+from handler import Handler  # noqa: E402
+
+
+SECRET_PATHS = ['/credentials.txt', '/passwords.txt', '/users.json', '/api_keys.json', '/api/v2/secrets', '/.env']
+
+
+def make_handler(consistent: bool) -> Handler:
+    # special_path_response only needs class-level state
+    handler = Handler.__new__(Handler)
+    handler.consistent_secrets = (
+        ConsistentSecrets(b'test-key', ByteLRUCache(1024 * 1024, ttl=60)) if consistent else None
+    )
+    return handler
+
+
+class SecretSourceTest(unittest.TestCase):
+
+    def setUp(self):
+        pools._pool_manager = None
+
+    def tearDown(self):
+        pools._pool_manager = None
+
+    def test_default_config_derives_secrets_without_pools(self):
+        self.assertTrue(Config().consistent_secrets)
+        handler = make_handler(consistent=True)
+        for path in SECRET_PATHS:
+            first = handler.special_path_response(path, '203.0.113.5')
+            self.assertEqual(first, handler.special_path_response(path, '203.0.113.5'), path)
+            self.assertNotEqual(first, handler.special_path_response(path, '203.0.113.6'), path)
+        self.assertIsNone(pools._pool_manager, 'pools were started although nothing draws from them')
+
+    def test_pools_serve_when_consistent_secrets_is_off(self):
+        manager = pools.PoolManager(size=64)
+        manager.fill_all()
+        pools._pool_manager = manager
+        before = len(manager.pools['password'])
+        make_handler(consistent=False).special_path_response('/passwords.txt', '203.0.113.5')
+        self.assertLess(len(manager.pools['password']), before)
+
+
+if __name__ == '__main__':
+    unittest.main()